@@ -0,0 +1,17 @@
+import pytest
+
+from utils.snapshot import synthetic_snapshot
+
+
+@pytest.fixture
+def offline_season(tmp_path, monkeypatch):
+    """
+    Replay a small synthetic season (GW1-10 finished) offline from tmp_path.
+    The test runs from tmp_path too, so every cache and store it writes
+    under its default relative path stays there.
+    """
+    snapshot = synthetic_snapshot(str(tmp_path / "snapshot"), n_players=40, finished=10)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("FPL_OFFLINE", "1")
+    monkeypatch.setenv("FPL_CACHE_DIR", snapshot)
+    return snapshot
@@ -1,18 +1,40 @@
 import sys 
 
-from utils.main import main as run_main
+from utils.main import main as run_main, main_range as run_main_range, main_horizon as run_main_horizon, plan as run_plan
 from utils.evaluate import evaluate as run_evaluate
 from utils.scout_get_data import scout_get_data as run_scout
 from utils.compare import compare_scores
+from utils.backtest import backtest as run_backtest
+from utils.results_store import open_store
 import os
+import atexit
+
+from utils import profiling
+from utils.models import load_model_config
+
+MODE = "pooled" if "-p" in sys.argv else "player"
+
+WORKERS = 1
+if "-j" in sys.argv:
+    j_at = sys.argv.index("-j")
+    if len(sys.argv) <= j_at + 1 or not sys.argv[j_at + 1].isdigit():
+        raise SystemExit("Worker count must be an integer after -j.")
+    WORKERS = int(sys.argv[j_at + 1])
+
+# model config written by utils/tune.py (mode, backend and parameters)
+CONFIG = None
+if "--config" in sys.argv:
+    c_at = sys.argv.index("--config")
+    if len(sys.argv) <= c_at + 1:
+        raise SystemExit("Config file must be specified after --config.")
+    CONFIG = load_model_config(sys.argv[c_at + 1])
 
 def m(gw: int, end: int, i: int) -> int:
     if len(sys.argv) > i + 1:
         if sys.argv[i + 1].isdigit():
             end = int(sys.argv[i + 1])
 
-            for j in range(gw, end + 1):
-                run_main(j)
+            run_main_range(gw, end, MODE, WORKERS, CONFIG)
 
         else:
             raise SystemExit("End GW must be an integer.")
@@ -22,66 +44,108 @@ def m(gw: int, end: int, i: int) -> int:
     return end, i+1
 
 def e(gw: int, end: int):
-    if end == -1:
-        run_evaluate(gw)
-    else:
-        for j in range(gw, end + 1):
-            run_evaluate(j)
+    with profiling.stage("evaluate"):
+        if end == -1:
+            run_evaluate(gw)
+        else:
+            for j in range(gw, end + 1):
+                run_evaluate(j)
 
 def s(gw: int, end: int, i: int):
     evaluate = False
     if sys.argv[i] == "-se":
         evaluate = True
 
-    if end == -1:
-        run_scout(gw, evaluate)
-    else:
-        for j in range(gw, end + 1):
-            run_scout(j, evaluate)
+    with profiling.stage("scout"):
+        if end == -1:
+            run_scout(gw, evaluate)
+        else:
+            for j in range(gw, end + 1):
+                run_scout(j, evaluate)
+
+def b(gw: int, end: int):
+    with profiling.stage("backtest"):
+        if end == -1:
+            run_backtest(2, gw)
+        else:
+            run_backtest(gw, end)
+
+def f(gw: int, i: int) -> int:
+    if len(sys.argv) <= i + 1 or not sys.argv[i + 1].isdigit():
+        raise SystemExit("Horizon (number of GWs) must be specified after -f.")
+    run_main_horizon(gw, int(sys.argv[i + 1]), MODE, WORKERS, config=CONFIG)
+    return i + 1
+
+def t(gw: int, i: int) -> int:
+    horizon = 6
+    if len(sys.argv) > i + 1 and sys.argv[i + 1].isdigit():
+        horizon = int(sys.argv[i + 1])
+        i += 1
+    if gw - 1 not in open_store().gws("squads"):
+        raise SystemExit(f"Squad for GW{gw - 1} not found; the transfer plan starts from it.")
+    run_plan(gw, horizon, MODE, WORKERS, config=CONFIG)
+    return i
 
 def c(gw: int, all: bool):
-    compare_scores(gw, all)
+    with profiling.stage("compare"):
+        compare_scores(gw, all)
 
 if __name__ == "__main__":
     if len(sys.argv) < 2 or sys.argv[1] == "-e" or sys.argv[1] == "-s":
-        raise SystemExit("Usage: run.py <GW> -m [end] -e -s[e] -c[a]")
+        raise SystemExit("Usage: run.py <GW> -m [end] -e -s[e] -c[a] -p -j [workers] -b -t [horizon] -f <horizon> --profile --cprofile --config <file>")
     
     if not sys.argv[1].isdigit():
         raise SystemExit("GW must be an integer.")
     gw = int(sys.argv[1])
 
+    if "--profile" in sys.argv or "--cprofile" in sys.argv:
+        profiling.enable(cprofile="--cprofile" in sys.argv)
+        atexit.register(profiling.report)
+
     end = -1
 
-    if len(sys.argv) > 2:
-        i = 2
-        while i in range(len(sys.argv)):
-            if sys.argv[i] not in ["-e", "-s", "-se", "-m", "-c", "-ca"] and not sys.argv[i].isdigit():
-                raise SystemExit(f"Unknown argument: {sys.argv[i]}")
-        
-            if ("-m" not in sys.argv and i == 2  
-                and os.path.exists(f"data/gw{gw}_predicted_points.csv") == False):
-                run_main(gw)
-
-            elif sys.argv[i] == "-m":
-                end, i = m(gw, end, i)              
-
-            elif sys.argv[i] == "-e":
-                e(gw, end)
-
-            elif sys.argv[i] in ["-s", "-se"]:
-                if not os.path.exists(f"scout/gw{gw}_scout_data.csv"):
-                    SystemExit(f"Scout data for GW{gw} not found.")
-                s(gw, end, i)
-
-            elif (sys.argv[i] in ["-c", "-ca"] and 
-                os.path.exists(f"teams/gw{gw}_squad.csv") and os.path.exists(f"scout/gw{gw}_scout_picks.csv")):
-                all = sys.argv[i] == "-ca"
-                print(all)
-                c(gw, all)
-
-            i += 1
-    else:
-        run_main(gw)
+    # actions choose what runs; -p, -j N, --profile/--cprofile and --config only modify it
+    ACTIONS = ["-e", "-s", "-se", "-m", "-c", "-ca", "-b", "-t", "-f"]
+    OPTIONS = ["-p", "-j", "--profile", "--cprofile", "--config"]
+    for i in range(2, len(sys.argv)):
+        if (sys.argv[i] not in ACTIONS + OPTIONS and not sys.argv[i].isdigit()
+                and sys.argv[i - 1] != "--config"):
+            raise SystemExit(f"Unknown argument: {sys.argv[i]}")
+    actions = [a for a in sys.argv[2:] if a in ACTIONS]
+
+    # no action: predict and pick the squad; -e/-s/-c first predict a GW that has no predictions yet
+    if not actions or (not any(flag in actions for flag in ["-m", "-b", "-t", "-f"])
+                       and not os.path.exists(f"data/gw{gw}_predicted_points.csv")):
+        run_main(gw, MODE, WORKERS, config=CONFIG)
+
+    i = 2
+    while i < len(sys.argv):
+        if sys.argv[i] == "-m":
+            end, i = m(gw, end, i)
+
+        elif sys.argv[i] == "-b":
+            b(gw, end)
+
+        elif sys.argv[i] == "-t":
+            i = t(gw, i)
+
+        elif sys.argv[i] == "-f":
+            i = f(gw, i)
+
+        elif sys.argv[i] == "-e":
+            e(gw, end)
+
+        elif sys.argv[i] in ["-s", "-se"]:
+            if not os.path.exists(f"scout_picks/gw{gw}_scout_picks.csv"):
+                raise SystemExit(f"Scout picks for GW{gw} not found.")
+            s(gw, end, i)
 
+        elif sys.argv[i] == "-c":
+            if not (os.path.exists(f"teams/gw{gw}_squad.csv") and os.path.exists(f"scout_picks/gw{gw}_scout_picks.csv")):
+                raise SystemExit(f"Squad or scout picks for GW{gw} not found.")
+            c(gw, False)
 
+        elif sys.argv[i] == "-ca":
+            c(gw, True)
 
+        i += 1
@@ -0,0 +1,28 @@
+import json
+import os
+
+import pandas as pd
+
+from utils.get_points_scored import live_points, update_actual_points
+from utils.results_store import open_store
+from utils.snapshot import _put
+
+LIVE = os.path.join(os.path.dirname(__file__), "data", "event_live.json")
+
+
+def test_actual_points_come_from_the_snapshot_live_payload(offline_season):
+    with open(LIVE) as f:
+        _put(offline_season, "event/3/live/", json.load(f))
+
+    # a double gameweek's points arrive already summed in stats.total_points
+    assert live_points(3).to_dict() == {1: 6, 2: 13, 3: 0}
+
+    store = open_store()
+    store.append("predictions", 3, pd.DataFrame({"player_id": [1, 2, 99], "player_name": ["A", "B", "C"],
+                                                 "predicted_points": [4.0, 7.5, 2.0]}))
+    update_actual_points(3)
+
+    stored = store.query("predictions", [3]).set_index("player_id")
+    assert stored["actual_points"].to_dict() == {1: 6, 2: 13, 99: 0}
+    assert stored["predicted_points"].to_dict() == {1: 4.0, 2: 7.5, 99: 2.0}
+    assert pd.read_csv("data/gw3_predicted_points.csv")["actual_points"].tolist() == [13, 6, 0]
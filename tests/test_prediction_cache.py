@@ -0,0 +1,31 @@
+import os
+
+import pandas as pd
+
+from utils.config import FEATURES, TARGET
+from utils.predictor import predict_gameweek
+from utils.season import SeasonData
+
+
+def test_horizon_predictions_are_not_reused_for_a_single_gw(offline_season, capsys):
+    season = SeasonData()
+    players = season.players.head(6)
+    season = SeasonData(season.data, players)
+
+    def run(gw, horizon=1):
+        df = predict_gameweek(season.data, players, gw, FEATURES, TARGET, season=season, horizon=horizon)
+        return df[df["round"] == gw].set_index("player_id").sort_index()
+
+    # GW5 -f 2 fits once, holding out round 5 only, so its GW6 rows come from a model that saw round 6
+    horizon = run(5, horizon=2)
+    single = run(6)
+    os.remove("cache/predictions.sqlite")  # relative to offline_season's scratch directory
+    fresh = run(6)
+
+    pd.testing.assert_frame_equal(single, fresh)
+    assert not horizon.empty
+
+    # an unchanged single-GW rerun is still served from the cache
+    capsys.readouterr()
+    assert run(6).equals(fresh)
+    assert "Models: 6 cached" in capsys.readouterr().out
@@ -0,0 +1,38 @@
+import os
+
+import pandas as pd
+
+from utils.results_store import open_store
+
+
+def _write(path: str, rows: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pd.DataFrame(rows).to_csv(path, index=False)
+
+
+def test_horizon_files_are_not_imported_as_their_first_gw(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _write("data/gw5_predicted_points.csv", {"player_id": [1, 2], "player_name": ["A", "B"],
+                                             "round": [5, 5], "predicted_points": [3.0, 4.0]})
+    _write("data/gw5_to_gw7_predicted_points.csv", {"player_id": [1, 1, 9], "player_name": ["A", "A", "Z"],
+                                                    "round": [5, 6, 7], "predicted_points": [9.0, 9.0, 9.0]})
+
+    stored = open_store().query("predictions")
+    assert stored["gw"].unique().tolist() == [5]
+    assert stored.set_index("player_id")["predicted_points"].to_dict() == {1: 3.0, 2: 4.0}
+
+
+def test_csvs_changed_outside_the_store_are_reimported(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = open_store()
+    store.append("predictions", 3, pd.DataFrame({"player_id": [1], "player_name": ["A"], "predicted_points": [2.0]}))
+    path = store.export("predictions", 3)
+
+    # an export is already in sync, so reopening keeps the stored rows as they are
+    assert open_store().query("predictions", [3])["predicted_points"].tolist() == [2.0]
+
+    # e.g. a newer copy checked out from git
+    _write(path, {"player_id": [1, 4], "player_name": ["A", "D"], "round": [3, 3], "predicted_points": [5.0, 1.0]})
+    os.utime(path, (os.path.getmtime(path) + 10,) * 2)
+    stored = open_store().query("predictions", [3]).set_index("player_id")
+    assert stored["predicted_points"].to_dict() == {1: 5.0, 4: 1.0}
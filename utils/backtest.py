@@ -0,0 +1,211 @@
+import os
+import pickle
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from utils.config import FEATURES, TARGET, POOLED_FEATURES
+from utils.evaluate import prediction_metrics
+from utils.feature_rows import build_training_matrix, attach_fixture_ctx
+from utils.models import BACKENDS, make_model
+from utils.season import SeasonData
+from utils.select_team import select_squad
+
+# name -> model configuration replayed by backtest()
+#   kind 'pooled': one model over every player's rows (as predict_gameweek_pooled)
+#   kind 'player': one model per player (as predict_gameweek, single run)
+#   kind 'mean'  : season-average points so far, as a no-model baseline
+#   backend: any of utils/models.py's BACKENDS (default 'forest'); other keys are its parameters
+DEFAULT_CONFIGS = {
+    "mean": {"kind": "mean"},
+    "pooled_rf": {"kind": "pooled", "n_estimators": 200, "min_samples_leaf": 3},
+    "pooled_rf_small": {"kind": "pooled", "n_estimators": 50, "min_samples_leaf": 10},
+}
+
+RESULTS_PATH = "backtest/results.csv"
+BACKENDS_PATH = "backtest/backends.csv"
+
+
+class WalkForwardState:
+    """
+    Running per-player sums/counts over rounds already replayed.
+
+    advance_to(gw) ingests only the rounds not seen yet, so each step costs
+    O(rows in the new round) rather than a rebuild from round 1.
+    """
+
+    def __init__(self, table: pd.DataFrame, FEATURES: list, TARGET: str):
+        self.table = table
+        self.cols = FEATURES + [TARGET]
+        self.player_ids = np.sort(table['player_id'].unique())
+        self.sums = np.zeros((len(self.player_ids), len(self.cols)))
+        self.counts = np.zeros((len(self.player_ids), len(self.cols)))
+        self.rows = np.zeros(len(self.player_ids), dtype=int)
+        self.next_round = 1
+
+    def advance_to(self, gw: int):
+        for rnd in range(self.next_round, gw):
+            new = self.table[self.table['round'] == rnd]
+            if new.empty:
+                continue
+            g = new.groupby('player_id')[self.cols]
+            at = np.searchsorted(self.player_ids, g.size().index.to_numpy())
+            self.sums[at] += g.sum(min_count=1).fillna(0).to_numpy()
+            self.counts[at] += g.count().to_numpy()
+            self.rows[at] += g.size().to_numpy()
+        self.next_round = max(self.next_round, gw)
+
+    def means(self) -> pd.DataFrame:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            m = self.sums / self.counts
+        out = pd.DataFrame(m, columns=self.cols, index=self.player_ids)
+        out['n_rows'] = self.rows
+        return out
+
+
+def _prediction_rows(state: WalkForwardState, season: SeasonData, gw: int, FEATURES: list, TARGET: str) -> pd.DataFrame:
+    """Season-so-far means per player with GW's fixture context, like build_prediction_rows."""
+    means = state.means()
+    means = means[means['n_rows'] >= 2]
+
+    rows = attach_fixture_ctx(means, season.players, season.fixtures, gw)
+    rows['player_avg_points'] = rows[TARGET]
+    rows = rows.join(season.players.set_index('id')[['web_name', 'team', 'element_type']])
+    rows.index.name = 'player_id'
+    return rows.reset_index()
+
+
+def _fit_predict(cfg: dict, train: pd.DataFrame, pred: pd.DataFrame, FEATURES: list, TARGET: str,
+                 n_jobs: int = -1) -> tuple:
+    """
+    Per-match prediction for every row of pred, trained only on train
+    (rounds < GW); with the fit and predict seconds and the pickled size of
+    the fitted model(s) in MB.
+    """
+    if cfg["kind"] == "mean":
+        return pred[TARGET].to_numpy(), 0.0, 0.0, 0.0
+
+    backend = cfg.get("backend", "forest")
+    params = {k: v for k, v in cfg.items() if k not in ("kind", "backend")}
+
+    if cfg["kind"] == "pooled":
+        features = FEATURES + POOLED_FEATURES
+        model = make_model(backend, params, 42, n_jobs=n_jobs)
+        t0 = time.perf_counter()
+        model.fit(train[features], train[TARGET])
+        t1 = time.perf_counter()
+        out = model.predict(pred[features])
+        return out, t1 - t0, time.perf_counter() - t1, len(pickle.dumps(model)) / 1e6
+
+    out = np.zeros(len(pred))
+    fit_secs, predict_secs, size = 0.0, 0.0, 0
+    by_player = dict(tuple(train.groupby('player_id')))
+    for i, pid in enumerate(pred['player_id']):
+        rows = by_player[pid]
+        model = make_model(backend, params, int(pid))
+        t0 = time.perf_counter()
+        model.fit(rows[FEATURES], rows[TARGET])
+        t1 = time.perf_counter()
+        out[i] = model.predict(pred.loc[[i], FEATURES])[0]
+        fit_secs, predict_secs = fit_secs + t1 - t0, predict_secs + time.perf_counter() - t1
+        size += len(pickle.dumps(model))
+    return out, fit_secs, predict_secs, size / 1e6
+
+
+def walk_forward_frames(season: SeasonData, start: int, end: int, FEATURES: list, TARGET: str):
+    """
+    (gw, train, pred) for GWs start..end in order, each built only from
+    rounds < GW; pred has one row per player with 'actual_points' for GW.
+    GWs without any prediction rows are skipped.
+    """
+    table = season.table(FEATURES, TARGET)
+    state = WalkForwardState(table, FEATURES, TARGET)
+    for gw in range(max(start, 2), end + 1):
+        state.advance_to(gw)
+        train = build_training_matrix(table, gw, FEATURES, TARGET, walk_forward=True)
+        pred = _prediction_rows(state, season, gw, FEATURES, TARGET)
+        if pred.empty:
+            continue
+
+        actual = table[table['round'] == gw].groupby('player_id')[TARGET].sum()
+        pred['actual_points'] = pred['player_id'].map(actual).fillna(0)
+        yield gw, train, pred
+
+
+def backtest(start: int, end: int, configs: dict = None, season: SeasonData = None,
+             FEATURES: list = FEATURES, TARGET: str = TARGET, results_path: str = RESULTS_PATH) -> pd.DataFrame:
+    """
+    Replay GWs start..end in strict walk-forward order: the model and the
+    prediction features for GW only ever see rounds < GW. Availability flags
+    are not known historically, so every player counts as available.
+
+    Returns one row per (config, gw) with MAE/RMSE/R², squad and XI points,
+    fit/predict seconds and model size, and also writes it to results_path.
+    """
+    configs = DEFAULT_CONFIGS if configs is None else configs
+    if season is None:
+        season = SeasonData()
+
+    # availability is unknown for past rounds: everyone counts as fit
+    players = season.players[['id', 'element_type', 'team', 'now_cost']].assign(status='a', chance_of_playing_next_round=np.nan)
+
+    results = []
+    for gw, train, pred in walk_forward_frames(season, start, end, FEATURES, TARGET):
+        for name, cfg in configs.items():
+            per_match, fit_secs, predict_secs, model_mb = _fit_predict(cfg, train, pred, FEATURES, TARGET)
+
+            preds = pd.DataFrame({
+                "player_id": pred['player_id'], "player_name": pred['web_name'], "round": gw,
+                "predicted_points": per_match * pred['n_fixtures'], "actual_points": pred['actual_points'],
+            })
+            mae, rmse, r2 = prediction_metrics(preds)
+
+            squad = select_squad(preds, players).merge(preds[['player_id', 'actual_points']], on='player_id', how='left')
+            results.append({
+                "config": name, "gw": gw, "n_players": len(preds), "n_train_rows": len(train),
+                "mae": mae, "rmse": rmse, "r2": r2,
+                "squad_points": float(squad['actual_points'].sum()),
+                "xi_points": float(squad.loc[squad['is_starter'] == 1, 'actual_points'].sum()),
+                "fit_seconds": fit_secs, "predict_seconds": predict_secs, "model_mb": model_mb,
+            })
+        print(f"Backtested GW{gw}")
+
+    out = pd.DataFrame(results)
+    os.makedirs(os.path.dirname(results_path), exist_ok=True)
+    out.to_csv(results_path, index=False)
+    print(f"Saved backtest results to {results_path}")
+    if not out.empty:
+        print(out.groupby('config')[['mae', 'rmse', 'r2', 'xi_points', 'fit_seconds', 'predict_seconds',
+                                     'model_mb']].mean().round(3))
+    return out
+
+
+def compare_backends(start: int, end: int, kind: str = "pooled", backends: list = None,
+                     season: SeasonData = None) -> pd.DataFrame:
+    """
+    Walk-forward comparison of the model backends (each with its default
+    parameters) against the season-average baseline: MAE per GW, then mean
+    fit and predict seconds, model size and accuracy per backend.
+    Results are written to backtest/backends.csv.
+    """
+    configs = {"mean": {"kind": "mean"}}
+    configs.update({b: {"kind": kind, "backend": b} for b in (backends or list(BACKENDS))})
+    out = backtest(start, end, configs, season, results_path=BACKENDS_PATH)
+    if not out.empty:
+        print("\nMAE per GW:")
+        print(out.pivot(index="gw", columns="config", values="mae")[list(configs)].round(3))
+    return out
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if not args:
+        raise SystemExit("Usage: python backtest.py <end GW> [start GW] [--backends [--player]]")
+
+    end = int(args[0])
+    start = int(args[1]) if len(args) > 1 else 2
+    if "--backends" in sys.argv:
+        compare_backends(start, end, "player" if "--player" in sys.argv else "pooled")
+    else:
+        backtest(start, end)
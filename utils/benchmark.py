@@ -0,0 +1,183 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from utils.snapshot import synthetic_snapshot, scale_snapshot
+
+RESULTS_PATH = "benchmarks/results.jsonl"
+SCALES = [1, 2, 5]
+N_PLAYERS = 700  # about a real season's bootstrap
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# settings that would point a benchmark run at the real caches and stores
+_PATH_VARS = ["FPL_RESULTS_DB", "FPL_PREDICTION_CACHE", "FPL_FEATURE_STORE", "FPL_MODEL_DIR"]
+
+
+def _timed(timings: dict, stage: str, fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    timings[stage] = time.perf_counter() - start
+    return out
+
+
+def run_stages(mode: str = "player", n_workers: int = 1) -> dict:
+    """
+    Run one GW of the pipeline against the current API cache and time each
+    stage. Writes to data/, teams/ and reports/ under the working directory,
+    so it is meant to run in a scratch directory (see benchmark()).
+    """
+    from utils.config import FEATURES, TARGET
+    from utils.fpl_api import get_json
+    from utils.season import SeasonData
+    from utils.main import predict
+    from utils.select_team import create_team
+    from utils.results_store import open_store
+    from utils.get_points_scored import update_actual_points
+    from utils.compare import compare_scores
+
+    finished = [e["id"] for e in get_json("bootstrap-static/")["events"] if e.get("finished")]
+    if not finished:
+        raise SystemExit("Snapshot has no finished GW to benchmark.")
+    gw = max(finished)
+
+    timings = {}
+    season = _timed(timings, "fetch", SeasonData)
+    _timed(timings, "feature_table", season.table, FEATURES, TARGET)
+
+    stage = "predict_gameweek_pooled" if mode == "pooled" else "predict_gameweek"
+    preds = _timed(timings, stage, predict, gw, mode, n_workers, season)
+    _timed(timings, f"{stage}_repeat", predict, gw, mode, n_workers, season)
+    store = open_store()
+    store.append("predictions", gw, preds)
+    store.export("predictions", gw)
+
+    squad = _timed(timings, "create_team", create_team, gw, preds, season.players)
+    timings["squad_solve"] = squad.attrs["solve"]["solve_ms"] / 1000
+    _timed(timings, "update_actual_points", update_actual_points, gw)
+    _timed(timings, "compare_scores", compare_scores, gw, True)
+    return {"gw": gw, "players": len(season.players), "timings": timings}
+
+
+def _commit() -> tuple:
+    """(short hash of HEAD, whether the tree has uncommitted changes)."""
+    git = lambda *args: subprocess.run(["git", *args], cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip()
+    return git("rev-parse", "--short", "HEAD") or "unknown", bool(git("status", "--porcelain", "--untracked-files=no"))
+
+
+def load_results(path: str = RESULTS_PATH) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def benchmark(scales: list = SCALES, n_players: int = N_PLAYERS, mode: str = "player", n_workers: int = 1,
+              snapshot: str = None, results_path: str = RESULTS_PATH) -> list:
+    """
+    Time the pipeline stages offline at each scale and append the timings to
+    results_path (one JSON record per stage, tagged with the commit).
+
+    Parameters
+    ----------
+    scales : list
+        Player-count multipliers; scale k clones every player of the base
+        snapshot k times.
+    n_players : int
+        Size of the synthetic base snapshot (ignored when snapshot is given).
+    snapshot : str, optional
+        A captured API snapshot (python -m utils.snapshot --capture) to use
+        as the base instead of synthetic data.
+
+    Each scale runs in a fresh process and scratch directory, so no cache
+    is warm and no real store or output file is touched.
+    """
+    commit, dirty = _commit()
+    records = []
+    with tempfile.TemporaryDirectory(prefix="fpl-bench-") as tmp:
+        base = snapshot or synthetic_snapshot(os.path.join(tmp, "base"), n_players)
+        for scale in scales:
+            snap = base if scale == 1 else scale_snapshot(base, os.path.join(tmp, f"x{scale}"), scale)
+            work = os.path.join(tmp, f"work{scale}")
+            os.makedirs(work)
+
+            env = {k: v for k, v in os.environ.items() if k not in _PATH_VARS}
+            env.update(FPL_OFFLINE="1", FPL_CACHE_DIR=os.path.abspath(snap), MPLBACKEND="Agg",
+                       PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, env.get("PYTHONPATH")])))
+            out_path = os.path.join(work, "timings.json")
+            print(f"Benchmarking {scale}x ({mode} mode)...")
+            with open(os.path.join(work, "run.log"), "w") as log:
+                proc = subprocess.run([sys.executable, "-m", "utils.benchmark", "--stages", out_path, mode,
+                                       str(n_workers)], cwd=work, env=env, stdout=log, stderr=subprocess.STDOUT)
+            if proc.returncode != 0:
+                with open(os.path.join(work, "run.log")) as log:
+                    raise RuntimeError(f"Benchmark run at {scale}x failed:\n{log.read()[-3000:]}")
+
+            with open(out_path) as f:
+                run = json.load(f)
+            for stage, secs in run["timings"].items():
+                records.append({
+                    "commit": commit, "dirty": dirty, "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "scale": scale, "players": run["players"], "gw": run["gw"], "mode": mode,
+                    "workers": n_workers, "snapshot": "captured" if snapshot else "synthetic",
+                    "stage": stage, "seconds": round(secs, 4),
+                    "python": platform.python_version(), "cpus": os.cpu_count(),
+                })
+
+    previous = load_results(results_path)
+    os.makedirs(os.path.dirname(results_path) or ".", exist_ok=True)
+    with open(results_path, "a") as f:
+        for r in records:
+            f.write(json.dumps(r) + "\n")
+    print(f"Saved {len(records)} timings to {results_path}")
+    print_comparison(records, previous)
+    return records
+
+
+def print_comparison(records: list, previous: list):
+    """Each timing next to the latest run of the same stage and size from another commit."""
+    last = {}
+    for r in previous:
+        if r["commit"] != records[0]["commit"]:
+            last[(r["stage"], r["players"], r["mode"], r["workers"], r["snapshot"])] = r
+
+    print(f"{'stage':<32}{'players':>8}{'seconds':>10}{'previous':>20}{'change':>9}")
+    for r in records:
+        before = last.get((r["stage"], r["players"], r["mode"], r["workers"], r["snapshot"]))
+        prev, change = "", ""
+        if before is not None:
+            prev = f"{before['seconds']:.3f} ({before['commit']})"
+            change = f"{(r['seconds'] / before['seconds'] - 1):+.0%}" if before["seconds"] > 0 else ""
+        print(f"{r['stage']:<32}{r['players']:>8}{r['seconds']:>10.3f}{prev:>20}{change:>9}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == "--stages":
+        # child process started by benchmark()
+        result = run_stages(sys.argv[3], int(sys.argv[4]))
+        with open(sys.argv[2], "w") as f:
+            json.dump(result, f)
+        sys.exit(0)
+
+    usage = "Usage: python benchmark.py [-n players] [-x 1,2,5] [--snapshot dir] [-p] [-j workers]"
+    args = {}
+    i = 1
+    while i < len(sys.argv):
+        if sys.argv[i] == "-p":
+            i += 1
+            continue
+        if sys.argv[i] not in ["-n", "-x", "--snapshot", "-j"] or i + 1 >= len(sys.argv):
+            raise SystemExit(usage)
+        args[sys.argv[i]] = sys.argv[i + 1]
+        i += 2
+
+    benchmark(
+        scales=[int(s) for s in args.get("-x", ",".join(map(str, SCALES))).split(",")],
+        n_players=int(args.get("-n", N_PLAYERS)),
+        mode="pooled" if "-p" in sys.argv else "player",
+        n_workers=int(args.get("-j", 1)),
+        snapshot=args.get("--snapshot"),
+    )
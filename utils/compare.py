@@ -1,63 +1,93 @@
-import requests
 import pandas as pd
 import sys
 import os
-import matplotlib.pyplot as plt
-import numpy as np
+from matplotlib.figure import Figure
+
+from utils.fpl_api import get_json
+from utils.results_store import open_store
+
+REPORT_PATH = "reports/season_comparison.png"
+REPORT_ROWS = "reports/season_comparison.csv"
+
+
+def average_scores() -> dict:
+    """GW -> average manager score, from one bootstrap-static payload."""
+    events = get_json("bootstrap-static/")["events"]
+    return {int(e["id"]): int(e.get("average_entry_score") or 0) for e in events}
+
+def finished_gws() -> set:
+    return {int(e["id"]) for e in get_json("bootstrap-static/")["events"] if e.get("finished")}
 
 def get_avg_manager_score_single(gw: int) -> int:
-    data = requests.get("https://fantasy.premierleague.com/api/bootstrap-static/").json()
-    events = pd.DataFrame(data["events"])
-    row = events.loc[events["id"] == gw, "average_entry_score"]
-    return int(row.iloc[0]) if not row.empty else 0
-
-def get_scout_picks_score(gw: int) -> int:
-    squad_path = f"scout_picks/gw{gw}_scout_picks.csv"
-    df = pd.read_csv(squad_path)
-    points = df["actual_points"].sum()
-    return int(points)
-
-def get_predicted_squad_score(gw: int) -> int:
-    squad_path = f"teams/gw{gw}_squad.csv"
-    df = pd.read_csv(squad_path)
-    points = df[df["is_starter"] == 1]["actual_points"].sum()
-    return int(points)
-
-def compare_scores(gw: int, all: bool):
+    return average_scores().get(int(gw), 0)
+
+def report_rows(store) -> pd.DataFrame:
+    """
+    One row per stored GW: average manager, scout picks and XI points.
+    Rows of finished and evaluated GWs are cached in REPORT_ROWS with a
+    fingerprint of the store rows they sum; a GW is queried again when it is
+    new, was not final when cached, or its squad, scout picks or actual
+    points have changed since.
+    """
+    cols = ["gw", "average", "scout_points", "xi_points", "final", "fingerprint"]
+    cached = pd.read_csv(REPORT_ROWS).reindex(columns=cols) if os.path.exists(REPORT_ROWS) else pd.DataFrame(columns=cols)
+    fingerprints = store.fingerprints()
+    cached = cached[cached["final"].fillna(False).astype(bool)
+                    & (cached["fingerprint"] == cached["gw"].map(fingerprints))]
+
+    todo = [g for g in store.gws("squads") if g not in set(cached["gw"])]
+    if todo:
+        averages, final = average_scores(), finished_gws() & store.evaluated_gws()
+        new = store.season_scores(todo)
+        new["average"] = new["gw"].map(averages).fillna(0)
+        new["final"] = new["gw"].isin(final)
+        new["fingerprint"] = new["gw"].map(fingerprints)
+        cached = pd.concat([cached, new[cols]], ignore_index=True) if not cached.empty else new[cols]
+        os.makedirs(os.path.dirname(REPORT_ROWS), exist_ok=True)
+        cached.sort_values("gw").to_csv(REPORT_ROWS, index=False)
+        print(f"Report rows: {len(todo)} GW(s) computed, {len(cached) - len(todo)} from cache")
+    return cached.sort_values("gw").reset_index(drop=True)
+
+def render_report(rows: pd.DataFrame, out_path: str = REPORT_PATH):
+    """Grouped bar chart of the three series, written to out_path (.png or .svg) without a display."""
+    fig = Figure(figsize=(max(6, len(rows) * 0.6), 4.5))
+    ax = fig.subplots()
+    x, width = rows["gw"].to_numpy(), 0.25
+
+    ax.bar(x - width, rows["average"], width=width, alpha=0.6, label="Average Manager Score")
+    ax.bar(x, rows["scout_points"], width=width, alpha=0.6, label="Scout Picks Actual Score")
+    ax.bar(x + width, rows["xi_points"], width=width, alpha=0.6, label="Predicted Squad Score")
+
+    ax.set_xlabel("Gameweek")
+    ax.set_ylabel("Score")
+    ax.set_title("Score Comparison per Gameweek")
+    ax.set_xticks(x)
+    ax.legend()
+    fig.tight_layout()
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    fig.savefig(out_path)
+    print(f"Saved comparison chart to {out_path}")
+
+def compare_scores(gw: int, all: bool, out_path: str = REPORT_PATH):
+    store = open_store()
+
     if all:
-        avg_avg_scores, avg_scout_scores, avg_predicted_scores = 0, 0, 0
-        for gw in range(1, len(os.listdir("teams")) + 1):
-            avg_avg_scores += get_avg_manager_score_single(gw)
-            avg_scout_scores += get_scout_picks_score(gw)
-            avg_predicted_scores += get_predicted_squad_score(gw)
-        total_gws = len(os.listdir("teams"))
-        print(f"Average Manager Score across all GWs: {avg_avg_scores / total_gws}")
-        print(f"Scout Picks Actual Score across all GWs: {avg_scout_scores / total_gws}")   
-        print(f"Predicted Squad Score across all GWs: {avg_predicted_scores / total_gws}")
-
-        width = 0.25
-        x = np.arange(1, total_gws + 1)
-
-        avg_scores = [get_avg_manager_score_single(gw) for gw in x]
-        scout_scores = [get_scout_picks_score(gw) for gw in x]
-        predicted_scores = [get_predicted_squad_score(gw) for gw in x]
-
-        plt.bar(x - width, avg_scores, width=width, alpha=0.6, label="Average Manager Score")
-        plt.bar(x, scout_scores, width=width, alpha=0.6, label="Scout Picks Actual Score")
-        plt.bar(x + width, predicted_scores, width=width, alpha=0.6, label="Predicted Squad Score")
-
-        plt.xlabel("Gameweek")
-        plt.ylabel("Score")
-        plt.title("Score Comparison per Gameweek")
-        plt.xticks(x)
-        plt.legend()
-        plt.tight_layout()
-        plt.show()
+        rows = report_rows(store)
+        if rows.empty:
+            raise SystemExit("No squads stored yet.")
+        print(f"Average Manager Score across all GWs: {rows['average'].mean()}")
+        print(f"Scout Picks Actual Score across all GWs: {rows['scout_points'].mean()}")
+        print(f"Predicted Squad Score across all GWs: {rows['xi_points'].mean()}")
+        render_report(rows, out_path)
 
     else:
+        scores = store.season_scores([gw])
+        if scores.empty:
+            raise SystemExit(f"No squads or scout picks stored for GW{gw}.")
         avg_score = get_avg_manager_score_single(gw)
-        scout_score = get_scout_picks_score(gw)
-        predicted_score = get_predicted_squad_score(gw)
+        scout_score = int(scores["scout_points"].iloc[0])
+        predicted_score = int(scores["xi_points"].iloc[0])
         print(f"Gameweek {gw} Comparison:")
         print(f"Average Manager Score: {avg_score}")
         print(f"Scout Picks Actual Score: {scout_score}")   
@@ -72,8 +102,7 @@ if __name__ == "__main__":
         print("Gameweek must be an integer.")
         sys.exit(1)
 
-    gw = int(sys.argv[1])
     if sys.argv[1] == "-a":
-        compare_scores(gw, all=True)
+        compare_scores(0, all=True)
     else:
-        compare_scores(gw, all=False)
+        compare_scores(int(sys.argv[1]), all=False)
@@ -5,4 +5,12 @@ FEATURES = [
     'expected_goals','expected_assists','expected_goal_involvements','expected_goals_conceded',
     'chance_of_playing_next_round', 'chance_of_playing_this_round', 'status_flag'
 ]
-TARGET = 'total_points'
\ No newline at end of file
+TARGET = 'total_points'
+
+# extra player-level columns used by the pooled (cross-player) model
+POOLED_FEATURES = ['element_type', 'team', 'player_avg_points']
+
+# model of both predictors: 'forest', 'hist_gb', 'ridge' or 'poisson' (see utils/models.py),
+# and parameters overriding that backend's defaults
+MODEL_BACKEND = 'forest'
+MODEL_PARAMS = {}
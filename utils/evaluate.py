@@ -4,12 +4,10 @@ import pandas as pd
 
 from utils.get_points_scored import update_actual_points
 from utils.select_team import evaluate_team_performance
+from utils.results_store import open_store
 
-def evaluate_predictions(gameweek: int):
-    """Evaluate model accuracy for a given gameweek."""
-    csv_path = f"data/gw{gameweek}_predicted_points.csv"
-    df = pd.read_csv(csv_path)
-
+def prediction_metrics(df: pd.DataFrame):
+    """MAE, RMSE and R² of predicted_points vs actual_points (rows where both are 0 ignored)."""
     mask = ~((df["predicted_points"] == 0) & (df["actual_points"] == 0))
     df = df.loc[mask].copy()
 
@@ -22,6 +20,13 @@ def evaluate_predictions(gameweek: int):
     mae = mean_absolute_error(y_true, y_pred)
     rmse = np.sqrt(mean_squared_error(y_true, y_pred))
     r2 = r2_score(y_true, y_pred)
+    return mae, rmse, r2
+
+def evaluate_predictions(gameweek: int):
+    """Evaluate model accuracy for a given gameweek."""
+    df = open_store().query("predictions", [gameweek])
+
+    mae, rmse, r2 = prediction_metrics(df)
 
     print(f"Evaluation for Gameweek {gameweek}")
     print(f"MAE : {mae:.3f}")
@@ -1,28 +1,107 @@
 import pandas as pd
 import numpy as np
-from utils.fixtures import fixture_ctx_for_gw
+from utils.fixtures import FixtureIndex
+from utils.get_player_data import HISTORY_COLS, NUMERIC_STATS
 
-def build_X_pred_for_gw(mh: pd.DataFrame, players_df: pd.DataFrame,
-                        player_id: int, gw: int, FEATURES: list, TARGET: str):
-    """Create a single feature row for GW using only rounds < GW + fixture context for GW."""
-    past = mh[mh['round'] != gw].copy()
-    if past.empty:
-        return None
+def build_season_table(histories: pd.DataFrame, players_df: pd.DataFrame, fixtures: FixtureIndex,
+                       FEATURES: list, TARGET: str) -> pd.DataFrame:
+    """
+    Long (player, round) table for every player at once: one row per played
+    fixture of the player's team (DNP rows zero-filled, FDR by team id),
+    with FEATURES/TARGET coerced to numeric in one pass. NaN in features is
+    kept, not filled.
+    """
+    team_rows = fixtures.team_rows[fixtures.team_rows['played']]
+    base = players_df[['id', 'team', 'element_type']].rename(columns={'id': 'player_id'}).merge(
+        team_rows[['round', 'team', 'opponent_team', 'was_home', 'fdr_score', 'kickoff_time']], on='team'
+    )
 
-    past['status_played'] = (past['status'] == 'Played').astype(int)
-    past['was_home'] = past['was_home'].astype(int)
+    hist = histories.reindex(columns=['player_id'] + [c for c in HISTORY_COLS if c not in
+                                                      ['was_home', 'kickoff_time', 'team_h_score', 'team_a_score']])
+    hist = hist.dropna(subset=['round', 'opponent_team'])
+    hist = hist.astype({'player_id': int, 'round': int, 'opponent_team': int})
+
+    full = base.merge(hist, on=['player_id', 'round', 'opponent_team'], how='left')
+
+    # label and fill numeric match stats for DNPs
+    full['status'] = np.where(full['minutes'].isna(), 'DNP', 'Played')
+    num_cols = [c for c in NUMERIC_STATS if c in full.columns]
+    full[num_cols] = full[num_cols].apply(pd.to_numeric, errors='coerce')
+    dnp = full['status'] == 'DNP'
+    full.loc[dnp, num_cols] = full.loc[dnp, num_cols].fillna(0)
+
+    full['status_played'] = (~dnp).astype(int)
+    full['was_home'] = full['was_home'].astype(int)
     for c in FEATURES + [TARGET]:
-        if c not in past.columns:
-            past[c] = np.nan
-    past[FEATURES + [TARGET]] = past[FEATURES + [TARGET]].apply(pd.to_numeric, errors='coerce')
+        if c not in full.columns:
+            full[c] = np.nan
+    full[FEATURES + [TARGET]] = full[FEATURES + [TARGET]].apply(pd.to_numeric, errors='coerce')
+
+    # players in players_df order, each player's matches in history order
+    full['player_order'] = full['player_id'].map({pid: i for i, pid in enumerate(players_df['id'])})
+    full = full.sort_values(['player_order', 'round', 'was_home'], kind='stable')
+    return full.drop(columns='player_order').reset_index(drop=True)
+
+
+def _past_rows(table: pd.DataFrame, gw: int, walk_forward: bool) -> pd.DataFrame:
+    # live runs train on every round but GW (as predict_gameweek always has);
+    # backtests must only ever see rounds before GW
+    return table[table['round'] < gw] if walk_forward else table[table['round'] != gw]
+
+
+def build_training_matrix(table: pd.DataFrame, gw: int, FEATURES: list, TARGET: str,
+                          walk_forward: bool = False) -> pd.DataFrame:
+    """
+    Training rows for predicting GW, for players with at least two past
+    matches: FEATURES/TARGET zero-filled plus a leave-one-out
+    'player_avg_points' (a row never sees its own target).
+    """
+    train = _past_rows(table, gw, walk_forward)
+    n = train.groupby('player_id')['round'].transform('size')
+    train = train[n >= 2].copy()
+    train[FEATURES + [TARGET]] = train[FEATURES + [TARGET]].fillna(0)
+
+    g = train.groupby('player_id')[TARGET]
+    n, total = g.transform('size'), g.transform('sum')
+    train['player_avg_points'] = (total - train[TARGET]) / (n - 1)
+    return train
+
+
+def attach_fixture_ctx(rows: pd.DataFrame, players_df: pd.DataFrame, fixtures: FixtureIndex, gw: int) -> pd.DataFrame:
+    """
+    Set was_home/fdr_score from each player's (first) GW fixture and add
+    n_fixtures, dropping players whose team blanks. rows is indexed by player_id.
+    """
+    team = players_df.set_index('id')['team'].reindex(rows.index)
+    ctx = [fixtures.get(t, gw) for t in team]
+    keep = np.array([len(c) > 0 for c in ctx], dtype=bool)
+    ctx = [c for c, k in zip(ctx, keep) if k]
+
+    rows = rows[keep].copy()
+    rows['was_home'] = [float(c[0].was_home) for c in ctx]
+    rows['fdr_score'] = [float(c[0].fdr) for c in ctx]
+    rows['n_fixtures'] = [len(c) for c in ctx]
+    return rows
+
 
-    means = past[FEATURES].mean(numeric_only=True).to_frame().T
+def build_prediction_rows(table: pd.DataFrame, players_df: pd.DataFrame, fixtures: FixtureIndex, gw: int,
+                          FEATURES: list, TARGET: str, walk_forward: bool = False) -> pd.DataFrame:
+    """
+    One feature row per player for GW, vectorized over all players: means of
+    past FEATURES with GW's fixture context, plus
+    element_type, team, player_avg_points and n_fixtures. Indexed by
+    player_id, in players_df order; players with < 2 past matches or a blank
+    GW are left out.
+    """
+    past = _past_rows(table, gw, walk_forward)
+    g = past.groupby('player_id', sort=False)
+    rows = g[FEATURES].mean()
+    rows['player_avg_points'] = g[TARGET].mean()
+    rows['n_rows'] = g.size()
+    rows = rows[rows['n_rows'] >= 2]
 
-    ctx = fixture_ctx_for_gw(players_df, player_id, gw)
-    if ctx is None:
-        return None
-    was_home, fdr = ctx
-    means['was_home'] = float(was_home)
-    means['fdr_score'] = float(fdr)
+    order = [pid for pid in players_df['id'] if pid in rows.index]
+    rows = attach_fixture_ctx(rows.loc[order], players_df, fixtures, gw)
 
-    return means[FEATURES]
+    meta = players_df.set_index('id')[['element_type', 'team']]
+    return rows.join(meta)
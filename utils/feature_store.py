@@ -0,0 +1,164 @@
+import hashlib
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+
+from utils.feature_rows import attach_fixture_ctx
+from utils.fixtures import FixtureIndex
+
+STORE_PATH = os.environ.get("FPL_FEATURE_STORE", "cache/features.sqlite")
+STORE_VERSION = 2  # bump when the tables' layout changes
+KEY = ["player_id", "round", "opponent_team"]
+
+
+def _schema(cols: list, season: str) -> str:
+    return hashlib.sha1(f"{STORE_VERSION}|{season}|{','.join(cols)}".encode()).hexdigest()[:12]
+
+
+class FeatureStore:
+    """
+    On-disk (SQLite) store of one season's per-match feature rows keyed by
+    (player_id, round, opponent_team), plus running per-player aggregates
+    (sums and non-null counts of every feature and the match count).
+
+    Ingesting a finished GW only touches that round's rows and the
+    aggregates of the players in it, so the season-long means used for the
+    next GW's prediction rows never need to be recomputed from scratch.
+    Player ids are only unique within a season, so the store is rebuilt
+    automatically when the season (or FEATURES/TARGET) changes.
+    """
+
+    def __init__(self, FEATURES: list, TARGET: str, season: str = None, path: str = STORE_PATH):
+        self.cols = FEATURES + [TARGET]
+        self.FEATURES, self.TARGET = FEATURES, TARGET
+        self.schema = _schema(self.cols, season)
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        cur = self.conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='meta'")
+        if cur.fetchone() is not None:
+            row = self.conn.execute("SELECT value FROM meta WHERE key='schema'").fetchone()
+            if row is not None and row[0] == self.schema:
+                return
+        self._create()
+
+    def _create(self):
+        """(Re)create empty tables for the current schema."""
+        for table in ["meta", "player_rounds", "player_aggregates"]:
+            self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+        feats = ", ".join(f"{c} REAL" for c in self.cols)
+        aggs = ", ".join(f"sum_{c} REAL NOT NULL DEFAULT 0, cnt_{c} INTEGER NOT NULL DEFAULT 0" for c in self.cols)
+        self.conn.executescript(f"""
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE player_rounds (
+                player_id INTEGER, round INTEGER, opponent_team INTEGER, {feats},
+                PRIMARY KEY (player_id, round, opponent_team)
+            );
+            CREATE TABLE player_aggregates (
+                player_id INTEGER PRIMARY KEY, n_rows INTEGER NOT NULL, {aggs}
+            );
+        """)
+        self.conn.execute("INSERT INTO meta VALUES ('schema', ?)", (self.schema,))
+        self.conn.commit()
+
+    def aggregates(self) -> pd.DataFrame:
+        return pd.read_sql_query("SELECT * FROM player_aggregates", self.conn, index_col="player_id")
+
+    def ingest_round(self, rows: pd.DataFrame):
+        """Add match rows the store does not hold yet (any players) and fold them into the running aggregates."""
+        if rows.empty:
+            return
+        rows = rows.sort_values("player_id", kind="stable")
+        ids = [int(p) for p in rows["player_id"].unique()]
+
+        agg = self.aggregates().reindex(ids)
+        agg["n_rows"] = agg["n_rows"].fillna(0)
+        for c in self.cols:
+            agg[f"sum_{c}"] = agg[f"sum_{c}"].fillna(0)
+            agg[f"cnt_{c}"] = agg[f"cnt_{c}"].fillna(0)
+
+        g = rows.groupby("player_id")
+        sums, cnts = g[self.cols].sum(min_count=1).fillna(0), g[self.cols].count()
+        for c in self.cols:
+            agg[f"sum_{c}"] += sums[c]
+            agg[f"cnt_{c}"] += cnts[c]
+        agg["n_rows"] += g.size()
+
+        row_cols = KEY + self.cols
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO player_rounds ({', '.join(row_cols)}) VALUES ({', '.join('?' * len(row_cols))})",
+            [tuple(None if pd.isna(v) else float(v) for v in r) for r in rows[row_cols].itertuples(index=False)],
+        )
+        agg = agg.reset_index().rename(columns={"index": "player_id"})
+        agg_cols = list(agg.columns)
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO player_aggregates ({', '.join(agg_cols)}) VALUES ({', '.join('?' * len(agg_cols))})",
+            [tuple(float(v) for v in r) for r in agg.itertuples(index=False)],
+        )
+        self.conn.commit()
+
+    def sync(self, table: pd.DataFrame, through_round: int) -> int:
+        """
+        Ingest every row of the season table up to through_round whose
+        (player_id, round, opponent_team) the store does not hold yet, so a
+        fixture played after its round was ingested (e.g. the second match of
+        a double) is still added. A store holding rounds past through_round
+        is from an earlier season and is emptied first. Returns the number of
+        rows added; 0 on a rerun with nothing new.
+        """
+        last = self.conn.execute("SELECT MAX(round) FROM player_rounds").fetchone()[0]
+        if last is not None and last > through_round:
+            self._create()
+
+        done = table[table["round"] <= through_round]
+        seen = pd.read_sql_query(f"SELECT {', '.join(KEY)} FROM player_rounds", self.conn).assign(seen=True)
+        found = done[KEY].astype(int).merge(seen, on=KEY, how="left")["seen"].notna().to_numpy()
+        new = done[~found]
+        for _, rows in new.groupby("round"):
+            self.ingest_round(rows)
+        return len(new)
+
+    def prediction_rows(self, players_df: pd.DataFrame, fixtures: FixtureIndex, gw: int) -> pd.DataFrame:
+        """
+        Same frame as feature_rows.build_prediction_rows, read from the
+        precomputed aggregates (valid when every ingested round is before GW).
+        """
+        agg = self.aggregates()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rows = pd.DataFrame({c: agg[f"sum_{c}"] / agg[f"cnt_{c}"].where(agg[f"cnt_{c}"] > 0)
+                                 for c in self.FEATURES}, index=agg.index)
+            rows["player_avg_points"] = agg[f"sum_{self.TARGET}"] / agg[f"cnt_{self.TARGET}"]
+        rows["n_rows"] = agg["n_rows"].astype(int)
+        rows = rows[rows["n_rows"] >= 2]
+
+        order = [pid for pid in players_df["id"] if pid in rows.index]
+        rows = attach_fixture_ctx(rows.loc[order], players_df, fixtures, gw)
+        return rows.join(players_df.set_index("id")[["element_type", "team"]])
+
+
+def played_share(FEATURES: list, TARGET: str, season: str, gw: int, path: str = STORE_PATH) -> pd.Series:
+    """
+    Each player's share of matches played in the rounds before GW, indexed
+    by player_id. Reads the store without creating or rebuilding it; empty
+    when there is no store for this season and FEATURES/TARGET.
+    """
+    empty = pd.Series(dtype=float, name="share")
+    if "status_played" not in FEATURES or not os.path.exists(path):
+        return empty
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key='schema'").fetchone()
+        if row is None or row[0] != _schema(FEATURES + [TARGET], season):
+            return empty
+        return pd.read_sql_query(
+            "SELECT player_id, AVG(status_played) AS share FROM player_rounds WHERE round < ? GROUP BY player_id",
+            conn, params=[int(gw)], index_col="player_id",
+        )["share"]
+    except sqlite3.Error:
+        return empty
+    finally:
+        conn.close()
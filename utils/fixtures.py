@@ -1,16 +1,56 @@
 import pandas as pd
-import requests
-
-def fixture_ctx_for_gw(players_df: pd.DataFrame, player_id: int, gw: int):
-    """Return (was_home:int, fdr:int) for player's team in GW or None if no fixture."""
-    team_id = int(players_df.loc[players_df['id'] == player_id, 'team'].iloc[0])
-    fx = pd.DataFrame(requests.get(f"https://fantasy.premierleague.com/api/fixtures/?event={gw}").json())
-    if fx.empty:
-        return None
-    row = fx[(fx['team_h'] == team_id) | (fx['team_a'] == team_id)]
-    if row.empty:
-        return None
-    row = row.iloc[0]
-    was_home = int(row['team_h'] == team_id)
-    fdr = int(row['team_h_difficulty'] if was_home else row['team_a_difficulty'])
-    return was_home, fdr
+from collections import namedtuple
+
+from utils.fpl_api import get_json
+from utils.fdr_score import build_fdr_table
+
+FixtureCtx = namedtuple("FixtureCtx", ["opponent", "was_home", "fdr", "finished"])
+
+
+class FixtureIndex:
+    """
+    Season fixture list indexed by (team_id, gw), built once per run.
+
+    A blank gameweek maps to an empty list and a double gameweek to two
+    FixtureCtx entries, so callers never need to rescan the raw fixtures.
+    """
+
+    def __init__(self, fixtures: list):
+        fx = pd.DataFrame(fixtures)
+        fx = fx.dropna(subset=["event"]).copy()
+        fx["event"] = fx["event"].astype(int)
+        if "finished_provisional" not in fx.columns:
+            fx["finished_provisional"] = fx["finished"]
+        fx["played"] = fx["finished"].fillna(False).astype(bool) | fx["finished_provisional"].fillna(False).astype(bool)
+
+        finished = fx.loc[fx["finished"] == True, "event"]
+        self.current_gw = int(finished.max()) + 1 if not finished.empty else 1
+
+        # the season the list belongs to, as the year of its first kickoff (e.g. '2025' for 2025/26)
+        kickoff = pd.to_datetime(fx.get("kickoff_time"), errors="coerce", utc=True)
+        self.season = str(kickoff.min().year) if kickoff is not None and kickoff.notna().any() else None
+
+        # one row per team per fixture, from that team's perspective
+        self.fdr_table = build_fdr_table(fx)
+        extra = fx[["id", "team_h", "team_a", "team_h_score", "team_a_score", "kickoff_time", "played"]]
+        rows = self.fdr_table.merge(extra.rename(columns={"id": "fixture"}), on="fixture", how="left")
+        rows = rows.sort_values(["round", "kickoff_time", "was_home"], ascending=[True, True, False])
+        self.team_rows = rows.reset_index(drop=True)
+
+        self.by_team_gw = {}
+        for t, g, opp, h, fdr, done in zip(rows["team"], rows["round"], rows["opponent_team"],
+                                           rows["was_home"], rows["fdr_score"], rows["played"]):
+            self.by_team_gw.setdefault((int(t), int(g)), []).append(
+                FixtureCtx(int(opp), bool(h), int(fdr), bool(done))
+            )
+
+    def get(self, team_id: int, gw: int) -> list:
+        """All fixtures for team in GW: [] for a blank, two entries for a double."""
+        return self.by_team_gw.get((int(team_id), int(gw)), [])
+
+    def n_fixtures(self, team_id: int, gw: int) -> int:
+        return len(self.get(team_id, gw))
+
+
+def load_fixture_index() -> FixtureIndex:
+    return FixtureIndex(get_json("fixtures/"))
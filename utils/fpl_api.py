@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils import profiling
+
+BASE_URL = "https://fantasy.premierleague.com/api"
+DEFAULT_CACHE_DIR = "cache/http"  # FPL_CACHE_DIR overrides it
+MAX_ENTRIES = 5000
+MAX_WORKERS = 16
+RATE_LIMIT = float(os.environ.get("FPL_RATE_LIMIT", "20"))  # requests per second
+
+# Freshness per endpoint (seconds), keyed by the first path segment.
+TTLS = {
+    "bootstrap-static": 15 * 60,
+    "fixtures": 15 * 60,
+    "element-summary": 6 * 60 * 60,
+    "event": 60,
+}
+DEFAULT_TTL = 10 * 60
+
+
+class _RateLimiter:
+    """Space outgoing requests at least 1/per_second apart across all threads."""
+
+    def __init__(self, per_second: float):
+        self._interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self._interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _make_session() -> requests.Session:
+    retry = Retry(total=4, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                  allowed_methods=["GET"], respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_WORKERS, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_session = _make_session()
+_limiter = _RateLimiter(RATE_LIMIT)
+_lock = threading.Lock()
+_memo = {}  # (cache dir, key) -> (fetched_at, body)
+_stats = {"hits": 0, "misses": 0, "revalidated": 0, "evicted": 0}
+_overrides = {}  # set_offline() settings, which take precedence over the environment
+_writes_since_evict = 0
+
+
+def cache_dir() -> str:
+    """The on-disk cache: set_offline's snapshot, else FPL_CACHE_DIR, read on every call."""
+    return _overrides.get("cache_dir") or os.environ.get("FPL_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+
+def offline() -> bool:
+    """True after set_offline() or while FPL_OFFLINE=1."""
+    return _overrides.get("offline", False) or os.environ.get("FPL_OFFLINE") == "1"
+
+
+def set_offline(snapshot_dir: str = None):
+    """Serve every request from disk only, optionally from a saved snapshot directory."""
+    _overrides["offline"] = True
+    if snapshot_dir is not None:
+        _overrides["cache_dir"] = snapshot_dir
+
+
+def save_snapshot(dest: str):
+    """Copy the current cache so it can later be replayed with set_offline(dest)."""
+    shutil.copytree(cache_dir(), dest, dirs_exist_ok=True)
+    print(f"Saved API snapshot to {dest}")
+
+
+def cache_stats() -> dict:
+    with _lock:
+        return dict(_stats)
+
+
+def _count(key: str):
+    with _lock:
+        _stats[key] += 1
+
+
+def _endpoint(path: str) -> str:
+    return path.strip("/").split("/")[0]
+
+
+def _cache_file(key: str, root: str = None) -> str:
+    digest = hashlib.sha1(key.encode()).hexdigest()
+    return os.path.join(root or cache_dir(), _endpoint(key), f"{digest}.json")
+
+
+def _read_entry(fp: str):
+    try:
+        with open(fp) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_entry(fp: str, entry: dict):
+    global _writes_since_evict
+    os.makedirs(os.path.dirname(fp), exist_ok=True)
+    tmp = f"{fp}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(entry, f)
+    os.replace(tmp, fp)
+
+    with _lock:
+        _writes_since_evict += 1
+        due = _writes_since_evict >= 200
+        if due:
+            _writes_since_evict = 0
+    if due:
+        evict()
+
+
+def evict(max_entries: int = None):
+    """Drop the least recently written entries once the cache grows past max_entries."""
+    max_entries = MAX_ENTRIES if max_entries is None else max_entries
+    files = []
+    for root, _, names in os.walk(cache_dir()):
+        files += [os.path.join(root, n) for n in names if n.endswith(".json")]
+    if len(files) <= max_entries:
+        return
+
+    files.sort(key=lambda p: os.path.getmtime(p))
+    for fp in files[:len(files) - max_entries]:
+        try:
+            os.remove(fp)
+            _count("evicted")
+        except OSError:
+            pass
+
+
+def get_json(path: str, params: dict = None):
+    """
+    GET an FPL API endpoint through the shared on-disk cache.
+
+    Parameters
+    ----------
+    path : str
+        Path relative to the API root, e.g. 'bootstrap-static/' or 'element-summary/1/'.
+    params : dict, optional
+        Query parameters, e.g. {'event': 5}.
+
+    Returns
+    -------
+    dict | list
+        Parsed JSON. The object is shared between callers and must not be mutated.
+    """
+    query = "&".join(f"{k}={params[k]}" for k in sorted(params)) if params else ""
+    key = f"{path}?{query}" if query else path
+    ttl = TTLS.get(_endpoint(path), DEFAULT_TTL)
+    now = time.time()
+    root, is_offline = cache_dir(), offline()
+
+    memo = _memo.get((root, key))
+    if memo is not None and (is_offline or now - memo[0] < ttl):
+        _count("hits")
+        profiling.http(_endpoint(path), "hit")
+        return memo[1]
+
+    fp = _cache_file(key, root)
+    entry = _read_entry(fp)
+    if entry is not None and (is_offline or now - entry["fetched_at"] < ttl):
+        _count("hits")
+        profiling.http(_endpoint(path), "hit")
+        _memo[(root, key)] = (entry["fetched_at"], entry["body"])
+        return entry["body"]
+
+    if is_offline:
+        raise RuntimeError(f"Offline mode: no cached response for '{key}' in {root}")
+
+    headers = {}
+    if entry is not None:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    _limiter.wait()
+    resp = _session.get(f"{BASE_URL}/{path.lstrip('/')}", params=params, headers=headers, timeout=30)
+
+    if resp.status_code == 304 and entry is not None:
+        _count("revalidated")
+        profiling.http(_endpoint(path), "revalidated", len(resp.content))
+        entry["fetched_at"] = now
+    else:
+        resp.raise_for_status()
+        _count("misses")
+        profiling.http(_endpoint(path), "miss", len(resp.content))
+        entry = {
+            "path": key,
+            "fetched_at": now,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "body": resp.json(),
+        }
+
+    _write_entry(fp, entry)
+    _memo[(root, key)] = (now, entry["body"])
+    return entry["body"]
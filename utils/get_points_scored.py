@@ -1,38 +1,40 @@
 import pandas as pd
-import requests
 import sys
 
-def update_actual_points(gameweek: int):
-    csv_path = f"data/gw{gameweek}_predicted_points.csv"
-
-    df = pd.read_csv(csv_path)
-    updated = []
-
-    for pid in df['player_id']:
-        # pull match history for this player
-        hist = requests.get(f"https://fantasy.premierleague.com/api/element-summary/{pid}/").json()
-        df_hist = pd.DataFrame(hist.get("history", []))
+from utils.fpl_api import get_json
+from utils.results_store import open_store, RESULTS_PATH
+
+def live_points(gameweek: int) -> pd.Series:
+    """
+    Every player's total points for GW (summed over a double) from one
+    /event/{gw}/live/ payload, indexed by player id. Without the API, replay
+    a snapshot that holds the payload (FPL_OFFLINE=1 FPL_CACHE_DIR=<snapshot>).
+    """
+    payload = get_json(f"event/{int(gameweek)}/live/")
+    elements = payload.get("elements", [])
+    return pd.Series(
+        [e["stats"]["total_points"] for e in elements],
+        index=[e["id"] for e in elements], dtype=int,
+    )
 
-        gw = int(gameweek)
-        if not df_hist.empty and 'round' in df_hist.columns:
-            df_hist['round'] = pd.to_numeric(df_hist['round'], errors='coerce')
-            mask = df_hist['round'] == gw
-            actual_points = int(df_hist.loc[mask, 'total_points'].sum()) if mask.any() else 0
-        else:
-            actual_points = 0
-
-        updated.append(actual_points)
+def update_actual_points(gameweek: int):
+    store = open_store()
+    df = store.query("predictions", [gameweek])
+    if df.empty:
+        raise SystemExit(f"No predictions stored for GW{gameweek}.")
+    points = live_points(gameweek)
 
-    df['actual_points'] = updated
-    df.to_csv(csv_path, index=False)
-    print(f"Updated actual points for GW{gameweek} in {csv_path}")
+    df['actual_points'] = df['player_id'].map(points).fillna(0).astype(int)
+    store.append("predictions", gameweek, df[["player_id", "actual_points"]])
+    csv_path = store.export("predictions", gameweek)
+    print(f"Updated actual points for GW{gameweek} in {RESULTS_PATH} and {csv_path}")
 
 
 if __name__ == "__main__":
     
     if len(sys.argv) != 2:
-        print("Usage: python update_actual_points.py <gameweek>")
+        print("Usage: python update_actual_points.py <gameweek>  (offline: FPL_OFFLINE=1 FPL_CACHE_DIR=<snapshot>)")
         sys.exit(1)
 
-    GW = sys.argv[1]
-    update_actual_points(GW)
\ No newline at end of file
+    GW = int(sys.argv[1])
+    update_actual_points(GW)
@@ -1,26 +1,85 @@
 import sys
-import pandas as pd
-import requests
 
-from utils.predictor import predict_gameweek
+from utils.predictor import predict_gameweek, predict_gameweek_pooled
 from utils.select_team import create_team
+from utils.transfer_planner import create_transfer_plan
+from utils.simulate import simulate_gameweek
+from utils.results_store import open_store
 from utils.config import FEATURES, TARGET
+from utils.fpl_api import cache_stats
+from utils.season import SeasonData
+from utils import profiling
 
-def main(gw: int):
-    data = requests.get("https://fantasy.premierleague.com/api/bootstrap-static/").json()
-    players = pd.DataFrame(data['elements'])
+def predict(gw: int, mode: str, n_workers: int, season: SeasonData, horizon: int = 1, config: dict = None):
+    """Predictions for gw (or gw..gw+horizon-1); a model config from tune.py sets the mode, backend and parameters."""
+    data, players = season.data, season.players
+    backend, params = None, None
+    if config is not None:
+        mode, backend, params = config["mode"], config["backend"], config.get("params", {})
+    if mode == "pooled":
+        return predict_gameweek_pooled(data, players, gw, FEATURES, TARGET, season=season, horizon=horizon,
+                                       backend=backend, params=params)
+    return predict_gameweek(data, players, gw, FEATURES, TARGET, season=season, n_workers=n_workers,
+                            horizon=horizon, backend=backend, params=params)
 
-    predictions_df = predict_gameweek(data, players, gw, FEATURES, TARGET, N_RUNS=5)
+def main(gw: int, mode: str = "player", n_workers: int = 1, season: SeasonData = None, config: dict = None):
+    if season is None:
+        with profiling.stage("season_data"):
+            season = SeasonData()
+    players = season.players
 
-    out_path = f"data/gw{gw}_predicted_points.csv"
-    predictions_df.to_csv(out_path, columns=["player_id","player_name","round","predicted_points"], index=False)
-    print(f"Saved predictions to {out_path}")
+    with profiling.stage("predict"):
+        predictions_df = predict(gw, mode, n_workers, season, config=config)
 
-    create_team(gw, predictions_df, players)
+    with profiling.stage("save_predictions"):
+        store = open_store()
+        store.append("predictions", gw, predictions_df)
+        out_path = store.export("predictions", gw)
+        print(f"Saved predictions to {out_path}")
+
+    with profiling.stage("create_team"):
+        create_team(gw, predictions_df, players)
+    with profiling.stage("simulate"):
+        simulate_gameweek(gw)
+
+    stats = cache_stats()
+    print(f"API cache: {stats['hits']} hits, {stats['misses']} misses, {stats['revalidated']} revalidated")
+
+def main_range(start: int, end: int, mode: str = "player", n_workers: int = 1, config: dict = None):
+    """Predict and pick squads for GWs start..end from one shared fetch of the season."""
+    with profiling.stage("season_data"):
+        season = SeasonData()
+    for gw in range(start, end + 1):
+        main(gw, mode, n_workers, season, config)
+
+def main_horizon(gw: int, horizon: int, mode: str = "player", n_workers: int = 1, season: SeasonData = None,
+                 config: dict = None):
+    """Train once and predict GWs gw..gw+horizon-1 into one long table (one row per player and GW)."""
+    if season is None:
+        with profiling.stage("season_data"):
+            season = SeasonData()
+
+    with profiling.stage("predict"):
+        predictions_df = predict(gw, mode, n_workers, season, horizon, config)
+    end = int(predictions_df["round"].max()) if not predictions_df.empty else gw
+    out_path = f"data/gw{gw}_to_gw{end}_predicted_points.csv"
+    predictions_df.to_csv(out_path, columns=["player_id","player_name","round","predicted_points","p10","p50","p90"], index=False)
+    print(f"Saved predictions for GW{gw}-{end} to {out_path}")
+    return predictions_df
+
+def plan(gw: int, horizon: int = 6, mode: str = "player", n_workers: int = 1, free_transfers: int = 1,
+         config: dict = None):
+    """Plan transfers for GWs gw..gw+horizon-1 starting from the squad picked for gw-1."""
+    with profiling.stage("season_data"):
+        season = SeasonData()
+    predictions_df = main_horizon(gw, horizon, mode, n_workers, season, config)
+    predictions = {int(g): df for g, df in predictions_df.groupby("round")}
+    with profiling.stage("transfer_plan"):
+        create_transfer_plan(gw, predictions, season.players, free_transfers)
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        raise SystemExit("Usage: python main.py <GW>")
+        raise SystemExit("Usage: python main.py <GW> [-p]")
 
     gw = int(sys.argv[1])
-    main(gw)
+    main(gw, "pooled" if "-p" in sys.argv else "player")
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import pickle
+import zlib
+
+import pandas as pd
+
+MODEL_DIR = os.environ.get("FPL_MODEL_DIR", "cache/models")
+MODEL_VERSION = 1   # bump to invalidate every stored model after a code change
+ADD_TREES = 50      # trees added per forest when new rounds arrive
+COMPRESS_LEVEL = 1  # zlib level; higher levels barely shrink a pickled forest but cost more time
+
+
+def schema_hash(FEATURES: list, TARGET: str, kind: str, params: dict, season: int = None) -> str:
+    """Hash of everything that makes a stored model incompatible if it changes."""
+    key = json.dumps({"v": MODEL_VERSION, "features": FEATURES, "target": TARGET,
+                      "kind": kind, "params": params, "season": season}, sort_keys=True)
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+
+def rows_key(X, y, rounds, through: int) -> str:
+    """Hash of the training rows (features, target and round) up to and including round through."""
+    upto = (rounds <= through).to_numpy()
+    rows = pd.DataFrame(X)[upto].assign(_target=y[upto].to_numpy(), _round=rounds[upto].to_numpy())
+    hashes = pd.util.hash_pandas_object(rows, index=False).to_numpy()
+    return hashlib.sha1(hashes.tobytes()).hexdigest()[:16]
+
+
+def _path(name: str) -> str:
+    return os.path.join(MODEL_DIR, f"{name}.pkl.z")
+
+
+def load_entry(name: str):
+    try:
+        with open(_path(name), "rb") as f:
+            return pickle.loads(zlib.decompress(f.read()))
+    except (OSError, EOFError, ValueError, zlib.error, pickle.UnpicklingError):
+        return None
+
+
+def save_entry(name: str, entry: dict):
+    path = _path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    # plain pickle: joblib's per-array handling made saving a 1000-tree forest take ~0.3s
+    with open(tmp, "wb") as f:
+        f.write(zlib.compress(pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL), COMPRESS_LEVEL))
+    os.replace(tmp, path)
+
+
+def warm_forests(name: str, schema: str, trained_through: int, make_model, n_models: int,
+                 X, y, rounds, max_trees: int = None, incremental: bool = True):
+    """
+    Return n_models fitted models (forests or another backend) for name, reusing what is on disk.
+
+    A stored model is only usable when its schema matches and X/y still hold
+    the rows it was trained on, unchanged (rows_key over rounds up to its
+    trained_through; rounds is aligned with X). Then:
+
+    - same trained_through: the stored forests as they are
+    - older trained_through: ADD_TREES more trees per forest (warm_start),
+      fitted on the rows whose round is newer than the stored model
+    - otherwise, once a forest would exceed max_trees, or for models that
+      are not incremental (any backend but the forest): a full refit on X/y
+
+    make_model(i) must build the i-th model with a fixed random_state (and
+    warm_start=True when incremental), so the stored result is reproducible.
+    Returns (models, status) where status is 'reused', 'updated' or 'retrained'.
+    """
+    entry = load_entry(name)
+    usable = (entry is not None and entry["schema"] == schema and len(entry["models"]) == n_models
+              and entry.get("rows") == rows_key(X, y, rounds, entry["trained_through"]))
+
+    if usable and entry["trained_through"] == trained_through:
+        return entry["models"], "reused"
+
+    models = entry["models"] if usable else None
+    if (models is not None and incremental and entry["trained_through"] < trained_through
+            and (max_trees is None or models[0].n_estimators + ADD_TREES <= max_trees)):
+        new = (rounds > entry["trained_through"]).to_numpy()
+        X_fit, y_fit = X[new], y[new]
+        for m in models:
+            m.n_estimators += ADD_TREES
+            m.fit(X_fit, y_fit)
+        status = "updated"
+    else:
+        models = [make_model(i) for i in range(n_models)]
+        for m in models:
+            m.fit(X, y)
+        status = "retrained"
+
+    save_entry(name, {"schema": schema, "trained_through": int(trained_through),
+                      "rows": rows_key(X, y, rounds, trained_through), "models": models})
+    return models, status
@@ -0,0 +1,142 @@
+import json
+import os
+import re
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import PoissonRegressor, Ridge
+from sklearn.model_selection import KFold, cross_val_predict
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+# backend -> default parameters (overridden by MODEL_PARAMS in config.py and by each predictor's own settings)
+BACKENDS = {
+    "forest": {"n_estimators": 200},
+    "hist_gb": {"max_iter": 200, "learning_rate": 0.05, "min_samples_leaf": 5, "early_stopping": False},
+    "ridge": {"alpha": 1.0},
+    "poisson": {"alpha": 1.0, "max_iter": 300},
+}
+POISSON_SHIFT = 4.0  # points can go negative (cards, own goals); the GLM is fitted on points + shift
+RESIDUAL_FOLDS = 3
+
+
+def forest_quantiles(model: RandomForestRegressor, X: pd.DataFrame):
+    """Mean and p10/p50/p90 across the forest's trees, from one (n_trees, n_rows) prediction matrix."""
+    X = np.asarray(X, dtype=np.float32)  # trees split on float32, as RandomForestRegressor.predict does
+    per_tree = np.stack([tree.predict(X, check_input=False) for tree in model.estimators_])
+    p10, p50, p90 = np.percentile(per_tree, [10, 50, 90], axis=0)
+    return per_tree.mean(axis=0), p10, p50, p90
+
+
+class ResidualQuantiles:
+    """
+    A point-estimate model whose p10/p50/p90 are its prediction plus the
+    10th/50th/90th percentile of its out-of-fold training residuals
+    (in-sample when there are too few rows to split), so a model that fits
+    its training rows closely does not get a falsely narrow range. The
+    model itself is fitted on every row. shift is added to the target
+    before fitting and taken off again when predicting.
+    """
+
+    def __init__(self, estimator, shift: float = 0.0):
+        self.estimator = estimator
+        self.shift = shift
+
+    def fit(self, X, y):
+        y = np.asarray(y, dtype=float)
+        target = np.maximum(y + self.shift, 0.0) if self.shift else y
+        if len(y) >= 2 * RESIDUAL_FOLDS:
+            folds = KFold(RESIDUAL_FOLDS, shuffle=True, random_state=0)
+            fitted = cross_val_predict(self.estimator, X, target, cv=folds) - self.shift
+            self.estimator.fit(X, target)
+        else:
+            self.estimator.fit(X, target)
+            fitted = self.predict(X)
+        self.offsets_ = np.percentile(y - fitted, [10, 50, 90]) if len(y) else np.zeros(3)
+        return self
+
+    def predict(self, X):
+        return self.estimator.predict(X) - self.shift
+
+    def quantiles(self, X):
+        mean = self.predict(X)
+        return (mean, *(mean + o for o in self.offsets_))
+
+
+def model_params(backend: str, params: dict = None) -> dict:
+    """backend's default parameters updated with params (ValueError for an unknown backend)."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown model backend '{backend}'; choose from {', '.join(BACKENDS)}.")
+    return {**BACKENDS[backend], **(params or {})}
+
+
+def make_model(backend: str, params: dict = None, seed: int = 42, n_jobs: int = None):
+    """
+    An unfitted model of backend. Forests are built with warm_start so the
+    model store can add trees; every other backend is wrapped in
+    ResidualQuantiles to give the same mean/p10/p50/p90 output.
+    """
+    params = model_params(backend, params)
+    if backend == "forest":
+        return RandomForestRegressor(**params, warm_start=True, random_state=seed, n_jobs=n_jobs)
+    if backend == "hist_gb":
+        return ResidualQuantiles(HistGradientBoostingRegressor(**params, random_state=seed))
+
+    # linear models: zero-fill like the training matrix, then standardize
+    prep = [SimpleImputer(strategy="constant", fill_value=0.0, keep_empty_features=True), StandardScaler()]
+    if backend == "ridge":
+        return ResidualQuantiles(make_pipeline(*prep, Ridge(**params)))
+    return ResidualQuantiles(make_pipeline(*prep, PoissonRegressor(**params)), shift=POISSON_SHIFT)
+
+
+def incremental(backend: str) -> bool:
+    """Whether a stored model of backend can be extended with new rounds instead of refitted."""
+    return backend == "forest"
+
+
+def model_quantiles(model, X: pd.DataFrame):
+    """(mean, p10, p50, p90) arrays for the rows of X, for a model from make_model."""
+    if isinstance(model, RandomForestRegressor):
+        return forest_quantiles(model, X)
+    return model.quantiles(X)
+
+
+CONFIG_DIR = "configs"
+CONFIG_FORMAT = 1  # bump when the keys of a model config file change
+
+
+def save_model_config(config: dict, config_dir: str = CONFIG_DIR) -> str:
+    """
+    Write config (mode, backend, params plus any notes) as the next
+    versioned file configs/model_v{n}.json and return its path. When the
+    latest version already has the same mode, backend and params, nothing
+    is written and the latest path is returned.
+    """
+    os.makedirs(config_dir, exist_ok=True)
+    taken = [int(m.group(1)) for m in (re.fullmatch(r"model_v(\d+)\.json", f) for f in os.listdir(config_dir)) if m]
+    if taken:
+        latest = os.path.join(config_dir, f"model_v{max(taken):03d}.json")
+        with open(latest) as f:
+            previous = json.load(f)
+        # compared after a JSON round trip, as the file stores it
+        if all(previous.get(k) == json.loads(json.dumps(config.get(k))) for k in ("mode", "backend", "params")):
+            print(f"Model config unchanged from {latest}")
+            return latest
+    version = max(taken, default=0) + 1
+    path = os.path.join(config_dir, f"model_v{version:03d}.json")
+    with open(path, "w") as f:
+        json.dump({"format": CONFIG_FORMAT, "version": version, **config}, f, indent=2)
+    return path
+
+
+def load_model_config(path: str) -> dict:
+    """A model config written by save_model_config, checked against the known backends."""
+    with open(path) as f:
+        config = json.load(f)
+    if config.get("format") != CONFIG_FORMAT:
+        raise ValueError(f"{path}: unsupported model config format {config.get('format')}")
+    if config.get("mode") not in ("player", "pooled"):
+        raise ValueError(f"{path}: mode must be 'player' or 'pooled'")
+    model_params(config["backend"], config.get("params"))  # ValueError for an unknown backend
+    return config
@@ -1,13 +1,15 @@
-import requests
 import pandas as pd
 import numpy as np
 
-def get_play_probability(player_meta, gw_requested: int) -> float:
-    # Determine current live GW from fixtures API
-    fixtures = pd.DataFrame(
-        requests.get("https://fantasy.premierleague.com/api/fixtures/").json()
-    )
-    current_gw = int(fixtures.loc[fixtures["finished"] == True, "event"].max()) + 1
+from utils.fpl_api import get_json
+
+def get_play_probability(player_meta, gw_requested: int, current_gw: int = None) -> float:
+    # Determine current live GW from fixtures API unless the caller already knows it
+    if current_gw is None:
+        fixtures = pd.DataFrame(
+            get_json("fixtures/")
+        )
+        current_gw = int(fixtures.loc[fixtures["finished"] == True, "event"].max()) + 1
 
     if gw_requested == current_gw:
         return player_meta["chance_of_playing_this_round"]
@@ -0,0 +1,96 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from utils.fpl_api import get_json
+from utils.play_probability import get_play_probability
+
+
+class PlayerRegistry:
+    """
+    Compact per-player metadata from bootstrap-static: one small typed array
+    per field plus an id -> row lookup array, so any field of any player (or
+    of many players at once) is a direct index instead of a DataFrame scan.
+    """
+
+    def __init__(self, data: dict):
+        start = time.perf_counter()
+        elements = data["elements"]
+        self.ids = np.array([e["id"] for e in elements], dtype=np.int32)
+        self._row = np.full(int(self.ids.max(initial=0)) + 1, -1, dtype=np.int32)
+        self._row[self.ids] = np.arange(len(self.ids), dtype=np.int32)
+
+        def column(key, dtype, default=np.nan):
+            return np.array([default if e.get(key) is None else e[key] for e in elements], dtype=dtype)
+
+        self.team = column("team", np.int16, 0)
+        self.element_type = column("element_type", np.int8, 0)
+        self.now_cost = column("now_cost", np.int16, 0)
+        self.status = column("status", "<U1", "a")
+        self.chance_next = column("chance_of_playing_next_round", np.float32)
+        self.chance_this = column("chance_of_playing_this_round", np.float32)
+        self.web_name = np.array([e.get("web_name", "") for e in elements], dtype=object)
+        self.build_seconds = time.perf_counter() - start
+
+    def rows(self, player_ids) -> np.ndarray:
+        """Row positions of player_ids (KeyError for an id bootstrap does not have)."""
+        ids = np.asarray(player_ids, dtype=np.int64)
+        rows = np.where((ids >= 0) & (ids < len(self._row)), self._row[np.clip(ids, 0, len(self._row) - 1)], -1)
+        if (rows < 0).any():
+            raise KeyError(f"Unknown player ids: {ids[rows < 0].tolist()}")
+        return rows
+
+    def play_factors(self, player_ids, gw: int, current_gw: int) -> np.ndarray:
+        """
+        Chance of playing in GW as a 0-1 multiplier: this-round/next-round
+        chance for the current GW and the one after, 1 when the API gives none
+        or for any later GW.
+        """
+        rows = self.rows(player_ids)
+        meta = {"chance_of_playing_this_round": self.chance_this[rows],
+                "chance_of_playing_next_round": self.chance_next[rows]}
+        chance = get_play_probability(meta, gw, current_gw)
+        if np.isscalar(chance):
+            return np.ones(len(rows))
+        return np.where(np.isnan(chance), 100.0, chance).astype(float) / 100.0
+
+    def frame(self) -> pd.DataFrame:
+        """The registry as a small DataFrame with the columns the pipeline joins on."""
+        return pd.DataFrame({
+            "id": self.ids, "web_name": self.web_name, "team": self.team, "element_type": self.element_type,
+            "now_cost": self.now_cost, "status": self.status,
+            "chance_of_playing_next_round": self.chance_next, "chance_of_playing_this_round": self.chance_this,
+        })
+
+    def memory_bytes(self) -> int:
+        arrays = [self.ids, self._row, self.team, self.element_type, self.now_cost, self.status,
+                  self.chance_next, self.chance_this]
+        names = sum(sys.getsizeof(n) for n in self.web_name)
+        return sum(a.nbytes for a in arrays) + self.web_name.nbytes + names
+
+
+_registries = {}
+
+def registry_for(data: dict = None) -> PlayerRegistry:
+    """The registry of one bootstrap-static payload, built on first use and shared afterwards."""
+    data = data if data is not None else get_json("bootstrap-static/")
+    found = _registries.get(id(data))
+    if found is None or found[0] is not data:
+        found = (data, PlayerRegistry(data))
+        _registries[id(data)] = found
+    return found[1]
+
+
+if __name__ == "__main__":
+    data = get_json("bootstrap-static/")
+    registry = PlayerRegistry(data)
+
+    start = time.perf_counter()
+    players = pd.DataFrame(data["elements"])
+    frame_secs = time.perf_counter() - start
+
+    print(f"Registry: {len(registry.ids)} players, built in {registry.build_seconds * 1000:.1f} ms, "
+          f"{registry.memory_bytes() / 1024:.0f} KiB")
+    print(f"elements DataFrame: {players.shape[1]} columns, built in {frame_secs * 1000:.1f} ms, "
+          f"{players.memory_usage(deep=True).sum() / 1024:.0f} KiB")
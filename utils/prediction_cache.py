@@ -0,0 +1,59 @@
+import hashlib
+import os
+import sqlite3
+import pandas as pd
+
+CACHE_PATH = os.environ.get("FPL_PREDICTION_CACHE", "cache/predictions.sqlite")
+
+
+def training_keys(train: pd.DataFrame, cols: list) -> dict:
+    """
+    player_id -> hash of that player's training rows (cols, in order). Two
+    runs get the same key only if they trained on the same rounds with the
+    same values, e.g. not when one held out a different round.
+    """
+    hashes = pd.util.hash_pandas_object(train[cols], index=False).to_numpy()
+    return {pid: hashlib.sha1(hashes[at].tobytes()).hexdigest()[:16]
+            for pid, at in train.groupby("player_id", sort=False).indices.items()}
+
+
+def row_versions(schema: str, training: pd.Series, rows: pd.DataFrame) -> pd.Series:
+    """
+    Version of each prediction row: the model schema, the key of the
+    player's training rows (training_keys) and a hash of the row's feature
+    values. Any change to model, training data or inputs gives a new version.
+    """
+    hashes = pd.util.hash_pandas_object(rows, index=False)
+    return pd.Series([f"{schema}:{t}:{h:016x}" for t, h in zip(training, hashes)], index=rows.index)
+
+
+class PredictionCache:
+    """
+    Per-match model outputs (mean, p10, p50, p90 before fixture count and
+    availability scaling) keyed by (gw, player_id, version), so a player
+    whose model and inputs have not changed is never refitted or re-predicted.
+    """
+
+    def __init__(self, path: str = CACHE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS predictions (
+                gw INTEGER, player_id INTEGER, version TEXT, mean REAL, p10 REAL, p50 REAL, p90 REAL,
+                PRIMARY KEY (gw, player_id, version)
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, gws: list) -> dict:
+        """(gw, player_id, version) -> (mean, p10, p50, p90) for every entry of gws."""
+        cur = self.conn.execute(
+            f"SELECT gw, player_id, version, mean, p10, p50, p90 FROM predictions "
+            f"WHERE gw IN ({', '.join('?' * len(gws))})", [int(g) for g in gws]
+        )
+        return {(g, p, v): q for g, p, v, *q in cur}
+
+    def put(self, entries: list):
+        """Store (gw, player_id, version, mean, p10, p50, p90) tuples."""
+        self.conn.executemany("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?, ?, ?)", entries)
+        self.conn.commit()
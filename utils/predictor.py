@@ -1,76 +1,243 @@
 import pandas as pd
 import numpy as np
-import random
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-from utils.get_player_data import get_player_match_history
-from utils.feature_rows import build_X_pred_for_gw
-from utils.play_probability import get_play_probability
+from utils.feature_rows import build_training_matrix
+from utils.season import SeasonData
+from utils.config import POOLED_FEATURES, MODEL_BACKEND, MODEL_PARAMS
+from utils.model_store import schema_hash, warm_forests
+from utils.models import incremental, make_model, model_params, model_quantiles
+from utils.prediction_cache import PredictionCache, row_versions, training_keys
+from utils import profiling
 
-def predict_gameweek(data: pd.DataFrame, players_df: pd.DataFrame, gw: int, FEATURES: list, TARGET: str, N_RUNS: int) -> pd.DataFrame:
-    results = []
-
-    for pid, name in zip(players_df['id'], players_df['web_name']):
-        mh = get_player_match_history(data, pid)
-        if mh is None or mh.empty or 'round' not in mh.columns:
-            continue
-
-        mh['round'] = pd.to_numeric(mh['round'], errors='coerce')
-        mh = mh.dropna(subset=['round'])
-
-        train_df = mh[mh['round'] != gw].copy()
-        if len(train_df) < 2:
-            continue
-
-        train_df['status_played'] = (train_df['status'] == 'Played').astype(int)
-        train_df['was_home'] = train_df['was_home'].astype(int)
-
-        for c in FEATURES + [TARGET]:
-            if c not in train_df.columns:
-                train_df[c] = np.nan
-
-        train_df[FEATURES + [TARGET]] = train_df[FEATURES + [TARGET]].apply(pd.to_numeric, errors='coerce').fillna(0)
-
-        X = train_df[FEATURES]
-        y = train_df[TARGET]
-
-        if len(X) >= 5:
-            X_train, _, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42)
-        else:
-            X_train, y_train = X, y
-
-        X_pred = build_X_pred_for_gw(mh, players_df, pid, gw, FEATURES, TARGET)
-        if X_pred is None:
-            continue
-
-        preds = []
-        for _ in range(N_RUNS):
-            model = RandomForestRegressor(n_estimators=200, random_state=random.randint(1, 10_000))
-            model.fit(X_train, y_train)
-            preds.append(float(model.predict(X_pred)[0]))
-        mean_pred = float(np.mean(preds))
-
-        bootstrap = data
-        player_meta = pd.DataFrame(bootstrap["elements"])[
-            ["id","status","chance_of_playing_next_round","chance_of_playing_this_round"]
-        ]           
-        
-        meta_row = player_meta.loc[player_meta["id"] == pid].iloc[0] if (player_meta["id"] == pid).any() else None
-        p_play = get_play_probability(meta_row, gw)
-        if np.isnan(p_play):
-            p_play = 100.0
-
-        mean_pred *= (p_play / 100.0)
-
-        results.append({
-            "player_id": int(pid),
-            "player_name": name,
-            "round": int(gw),
-            "predicted_points": mean_pred
-        })
+PLAYER_TREES = 250  # per-player forest; enough trees for stable p10/p90 at a quarter of the old 5 x 200 fit cost
 
+def _sorted_results(results: list) -> pd.DataFrame:
     df_out = pd.DataFrame(results)
     if df_out.empty or 'predicted_points' not in df_out.columns:
         return df_out.reset_index(drop=True)
-    return df_out.sort_values("predicted_points", ascending=False).reset_index(drop=True)
+    return df_out.sort_values(["round", "predicted_points"], ascending=[True, False]).reset_index(drop=True)
+
+
+def _predict_player(shared: dict, pid: int):
+    """
+    Fit (or load and update) the player's model on all his past matches;
+    return its per-match (mean, p10, p50, p90) for each of his prediction
+    rows, and the model status.
+    """
+    FEATURES, backend, params = shared["FEATURES"], shared["backend"], shared["params"]
+    X, y, rounds, trained_through = shared["train"][pid]
+    rows = shared["pred"].loc[[pid]]
+
+    # seeded by player so every path agrees
+    def make(_):
+        return make_model(backend, params, int(pid))
+
+    if shared["persist"]:
+        max_trees = 2 * params["n_estimators"] if backend == "forest" else None
+        (model,), status = warm_forests(f"player/{int(pid)}", shared["schema"], trained_through, make, 1,
+                                        X, y, rounds, max_trees=max_trees, incremental=incremental(backend))
+    else:
+        model, status = make(0), "fresh"
+        model.fit(X, y)
+
+    return np.column_stack(model_quantiles(model, rows[FEATURES])), status
+
+
+def _result_rows(pid: int, name: str, rows: pd.DataFrame, raw: np.ndarray) -> list:
+    """Output rows from per-match quantiles: a double gameweek counts both fixtures, then availability."""
+    scale = (rows["n_fixtures"] * rows["play_factor"]).to_numpy()
+    mean, p10, p50, p90 = (raw[:, k] * scale for k in range(4))
+
+    return [{
+        "player_id": int(pid),
+        "player_name": name,
+        "round": int(gw),
+        "predicted_points": float(m),
+        "p10": float(a),
+        "p50": float(b),
+        "p90": float(c),
+    } for gw, m, a, b, c in zip(rows["round"], mean, p10, p50, p90)]
+
+
+_shared = None
+
+def _init_worker(shared: dict):
+    global _shared
+    _shared = shared
+
+
+def _predict_chunk(players: list):
+    start = time.perf_counter()
+    rows = [(pid, *_predict_player(_shared, pid)) for pid in players]
+    return rows, os.getpid(), len(players), time.perf_counter() - start
+
+
+def _report_models(statuses: list):
+    if not statuses:
+        return
+    counts = pd.Series(statuses).value_counts()
+    print("Models: " + ", ".join(f"{n} {status}" for status, n in counts.items()))
+    for status, n in counts.items():
+        profiling.count(f"models_{status}", int(n))
+
+
+def _backend(backend: str, params: dict, forest_defaults: dict):
+    """
+    The backend and its full parameters: the configured ones unless a backend
+    is given, on top of the predictor's own forest settings.
+    """
+    if backend is None:
+        backend, params = MODEL_BACKEND, MODEL_PARAMS if params is None else params
+    base = forest_defaults if backend == "forest" else {}
+    return backend, model_params(backend, {**base, **(params or {})})
+
+
+def _horizon(data: dict, gw: int, horizon: int) -> list:
+    """GWs gw..gw+horizon-1, cut at the last GW of the season."""
+    last = max(e["id"] for e in data["events"]) if data.get("events") else gw + horizon - 1
+    return list(range(gw, min(gw + horizon - 1, last) + 1)) or [gw]
+
+
+def _feature_frames(data: dict, players_df: pd.DataFrame, gws: list, FEATURES: list, TARGET: str, season: SeasonData):
+    """
+    Training matrix for the first of gws, and per-player prediction rows for
+    every GW in gws (indexed by player_id, with 'round', that GW's fixture
+    context and the player's play factor); and whether models should be
+    persisted: only for an upcoming GW, whose training data is exactly the
+    finished rounds.
+    """
+    table = season.table(FEATURES, TARGET)
+    train = build_training_matrix(table, gws[0], FEATURES, TARGET)
+
+    frames = []
+    for gw in gws:
+        rows = season.prediction_rows(players_df, gw, FEATURES, TARGET)
+        rows["round"] = gw
+        rows["play_factor"] = season.registry.play_factors(rows.index, gw, season.fixtures.current_gw)
+        frames.append(rows)
+    pred = pd.concat(frames) if len(frames) > 1 else frames[0]
+    return train, pred, season.is_upcoming(gws[0], FEATURES, TARGET)
+
+
+def _fit_players(shared: dict, players: list, n_workers: int) -> list:
+    """(pid, raw quantiles, status) for each of players, fitted serially or across n_workers processes."""
+    if n_workers <= 1 or not players:
+        _init_worker(shared)
+        fitted, _, _, _ = _predict_chunk(players)
+    else:
+        # contiguous chunks, merged back in submission order => same rows as the serial loop
+        size = max(1, -(-len(players) // (n_workers * 4)))
+        chunks = [players[i:i + size] for i in range(0, len(players), size)]
+
+        fitted, per_worker = [], {}
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(shared,)) as pool:
+            for rows, worker, n, secs in pool.map(_predict_chunk, chunks):
+                fitted += rows
+                done = per_worker.setdefault(worker, [0, 0.0])
+                done[0] += n
+                done[1] += secs
+
+        for worker, (n, secs) in sorted(per_worker.items()):
+            print(f"  worker {worker}: {n} players in {secs:.1f}s ({n / secs if secs else 0:.1f}/s)")
+    return fitted
+
+
+def predict_gameweek(data: pd.DataFrame, players_df: pd.DataFrame, gw: int, FEATURES: list, TARGET: str,
+                     season: SeasonData = None, n_workers: int = 1, horizon: int = 1,
+                     backend: str = None, params: dict = None) -> pd.DataFrame:
+    """
+    Per-player models (MODEL_BACKEND from config unless backend is given;
+    the forest gets PLAYER_TREES trees, whose per-tree spread gives the
+    quantiles). With horizon > 1 each player's model is fitted once and
+    predicts GWs gw..gw+horizon-1 in the same pass (one row per player and
+    GW he has a fixture in, each with that GW's fixture context).
+    """
+    backend, params = _backend(backend, params, {"n_estimators": PLAYER_TREES})
+    if season is None:
+        season = SeasonData(data, players_df)
+
+    with profiling.stage("feature_frames"):
+        train, pred, persist = _feature_frames(data, players_df, _horizon(data, gw, horizon), FEATURES, TARGET, season)
+    train = train[train["player_id"].isin(pred.index)]
+    shared = {
+        "FEATURES": FEATURES, "backend": backend, "params": params, "pred": pred, "persist": persist,
+        "schema": schema_hash(FEATURES, TARGET, "player", {"backend": backend, **params}, season.fixtures.season),
+        "train": {pid: (rows[FEATURES], rows[TARGET], rows["round"], int(rows["round"].max()))
+                  for pid, rows in train.groupby("player_id", sort=False)},
+    }
+    # players whose model, training rows and inputs are unchanged since the last run come from the result cache
+    # (the training rows depend on the round held out, so a horizon run's later GWs never match a single-GW run)
+    cache = PredictionCache()
+    keys = training_keys(train, ["round", "opponent_team"] + FEATURES + [TARGET])
+    pred["version"] = row_versions(shared["schema"], pred.index.map(keys), pred[FEATURES]).to_numpy()
+    known = cache.get(sorted(pred["round"].unique()))
+    hits = {}
+    for g, pid, v in zip(pred["round"], pred.index, pred["version"]):
+        hits.setdefault(pid, []).append(known.get((int(g), int(pid), v)))
+
+    results = {pid: (np.array(q), "cached") for pid, q in hits.items() if None not in q}
+    players = [pid for pid in hits if pid not in results]
+
+    with profiling.stage("fit_predict"):
+        fitted = _fit_players(shared, players, n_workers)
+
+    cache.put([(int(g), int(pid), v, *map(float, q))
+               for pid, out, _ in fitted
+               for g, v, q in zip(pred.loc[[pid], "round"], pred.loc[[pid], "version"], out)])
+    results.update({pid: (out, status) for pid, out, status in fitted})
+    _report_models([status for _, status in results.values()])
+
+    names = players_df.set_index("id")["web_name"]
+    return _sorted_results([row for pid in hits
+                            for row in _result_rows(pid, names[pid], pred.loc[[pid]], results[pid][0])])
+
+
+def predict_gameweek_pooled(data: pd.DataFrame, players_df: pd.DataFrame, gw: int, FEATURES: list, TARGET: str,
+                            season: SeasonData = None, horizon: int = 1,
+                            backend: str = None, params: dict = None) -> pd.DataFrame:
+    """
+    Same output as predict_gameweek, but from one model trained on every
+    player's history at once (plus position, team and the player's average
+    points), with a single batched predict call for the whole GW, or for
+    every GW of the horizon at once. Only the model itself is stored between
+    runs; the PredictionCache of finished predictions is per-player only.
+    """
+    if season is None:
+        season = SeasonData(data, players_df)
+
+    with profiling.stage("feature_frames"):
+        train, pred, persist = _feature_frames(data, players_df, _horizon(data, gw, horizon), FEATURES, TARGET, season)
+    if train.empty or pred.empty:
+        return _sorted_results([])
+
+    features = FEATURES + POOLED_FEATURES
+    backend, params = _backend(backend, params, {"n_estimators": 200, "min_samples_leaf": 3})
+
+    def make(_):
+        return make_model(backend, params, 42, n_jobs=-1)
+
+    with profiling.stage("fit"):
+        if persist:
+            schema = schema_hash(features, TARGET, "pooled", {"backend": backend, **params}, season.fixtures.season)
+            (model,), status = warm_forests("pooled", schema, int(train["round"].max()), make, 1,
+                                            train[features], train[TARGET], rounds=train["round"], max_trees=500,
+                                            incremental=incremental(backend))
+            _report_models([status])
+        else:
+            model = make(0)
+            model.fit(train[features], train[TARGET])
+            profiling.count("models_fresh")
+    with profiling.stage("predict"):
+        scale = (pred["n_fixtures"] * pred["play_factor"]).to_numpy()
+        mean, p10, p50, p90 = (q * scale for q in model_quantiles(model, pred[features]))
+
+    names = players_df.set_index("id")["web_name"]
+    results = [
+        {"player_id": int(pid), "player_name": names[pid], "round": int(rnd), "predicted_points": float(m),
+         "p10": float(a), "p50": float(b), "p90": float(c)}
+        for pid, rnd, m, a, b, c in zip(pred.index, pred["round"], mean, p10, p50, p90)
+    ]
+    return _sorted_results(results)
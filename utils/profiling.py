@@ -0,0 +1,172 @@
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows; peak RSS is then left out
+    resource = None
+
+PROFILE_DIR = "profiles"
+
+_enabled = False
+_cprofile = False
+_stack = []
+_stages = []
+_http = {}
+_counters = {}
+_profiles = {}
+_started = None
+_lock = threading.Lock()  # API calls are recorded from the fetch threads
+
+
+class _Stage:
+    """One timed stage; nested stages are recorded with their depth."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.record = {"stage": self.name, "depth": len(_stack), "requests": _total_requests()}
+        _stages.append(self.record)  # in start order, so a stage is listed before its sub-stages
+        _stack.append(self)
+        self.profiler = None
+        if _cprofile and self.record["depth"] == 0:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.cpu = _cpu_seconds()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall, cpu = time.perf_counter() - self.wall, _cpu_seconds() - self.cpu
+        if self.profiler is not None:
+            self.profiler.disable()
+            _profiles.setdefault(self.name, []).append(self.profiler)
+        _stack.pop()
+        self.record.update(wall_s=round(wall, 4), cpu_s=round(cpu, 4),
+                           requests=_total_requests() - self.record["requests"], peak_rss_mb=_peak_rss_mb())
+        return False
+
+
+class _NoStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def enable(cprofile: bool = False):
+    """Start recording; with cprofile, each top-level stage also runs under cProfile."""
+    global _enabled, _cprofile, _started
+    _enabled, _cprofile, _started = True, cprofile, time.perf_counter()
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def stage(name: str):
+    """Context manager timing a stage (wall and CPU time, requests made, peak RSS); a no-op when disabled."""
+    return _Stage(name) if _enabled else _NO_STAGE
+
+
+def http(endpoint: str, outcome: str, nbytes: int = 0):
+    """Record one API call: outcome is 'hit', 'miss' or 'revalidated'; nbytes is what came over the wire."""
+    if not _enabled:
+        return
+    with _lock:
+        entry = _http.setdefault(endpoint, {"hit": 0, "miss": 0, "revalidated": 0, "bytes": 0})
+        entry[outcome] += 1
+        entry["bytes"] += nbytes
+
+
+def count(name: str, n: int = 1):
+    """Add n to a named counter, e.g. models fitted."""
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def _total_requests() -> int:
+    return sum(e["miss"] + e["revalidated"] for e in _http.values())
+
+
+def _cpu_seconds() -> float:
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system  # includes finished worker processes
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux; process pool workers count separately as children
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(own, children) / 1024, 1)
+
+
+def trace() -> dict:
+    """Everything recorded so far, as written to the JSON trace."""
+    hits = sum(e["hit"] for e in _http.values())
+    calls = sum(e["hit"] + e["miss"] + e["revalidated"] for e in _http.values())
+    return {
+        "total_wall_s": round(time.perf_counter() - _started, 4) if _started is not None else None,
+        "peak_rss_mb": _peak_rss_mb(),
+        "stages": _stages,
+        "http": _http,
+        "cache_hit_rate": round(hits / calls, 4) if calls else None,
+        "counters": _counters,
+    }
+
+
+def report(out_dir: str = PROFILE_DIR) -> str:
+    """Print the summary table and write the JSON trace (and the hottest stage's cProfile stats)."""
+    if not _enabled:
+        return None
+    result = trace()
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(out_dir, f"run_{stamp}.json")
+
+    top = [s for s in _stages if s["depth"] == 0 and "wall_s" in s]
+    if _cprofile and top:
+        hottest = max(top, key=lambda s: s["wall_s"])["stage"]
+        stats_path = os.path.join(out_dir, f"run_{stamp}_{hottest}.prof")
+        profilers = _profiles[hottest]
+        merged = pstats.Stats(profilers[0])
+        for p in profilers[1:]:
+            merged.add(p)
+        merged.dump_stats(stats_path)
+        result["cprofile"] = {"stage": hottest, "path": stats_path}
+
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+
+    print(f"\n{'stage':<34}{'wall s':>9}{'cpu s':>9}{'requests':>10}{'peak MB':>9}")
+    for s in _stages:
+        if "wall_s" not in s:  # still open, e.g. when reporting from inside a failing stage
+            continue
+        name = "  " * s["depth"] + s["stage"]
+        rss = "" if s["peak_rss_mb"] is None else f"{s['peak_rss_mb']:.0f}"
+        print(f"{name:<34}{s['wall_s']:>9.2f}{s['cpu_s']:>9.2f}{s['requests']:>10}{rss:>9}")
+
+    for endpoint, e in sorted(_http.items()):
+        print(f"HTTP {endpoint}: {e['miss'] + e['revalidated']} requests ({e['bytes'] / 1024:.0f} KiB), "
+              f"{e['hit']} cache hits")
+    if result["cache_hit_rate"] is not None:
+        print(f"API cache hit rate: {result['cache_hit_rate']:.0%}")
+    if _counters:
+        print("Counters: " + ", ".join(f"{k} {v}" for k, v in sorted(_counters.items())))
+    print(f"Total {result['total_wall_s']:.2f}s, peak RSS {result['peak_rss_mb']} MB")
+    if "cprofile" in result:
+        print(f"cProfile of hottest stage '{result['cprofile']['stage']}' saved to {result['cprofile']['path']}")
+    print(f"Saved profile trace to {path}")
+    return path
+
@@ -0,0 +1,185 @@
+import glob
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import pandas as pd
+
+RESULTS_PATH = os.environ.get("FPL_RESULTS_DB", "data/results.sqlite")
+
+# table -> (columns, where its per-GW CSV exports live)
+TABLES = {
+    "predictions": (["player_name", "predicted_points", "p10", "p50", "p90", "actual_points"],
+                    "data/gw{gw}_predicted_points.csv"),
+    "squads": (["player_name", "position", "is_starter", "bench_order", "predicted_points"],
+               "teams/gw{gw}_squad.csv"),
+    "scout_picks": (["player_name", "predicted_points", "p10", "p50", "p90"], "scout_picks/gw{gw}_scout_picks.csv"),
+}
+INT_COLS = ["is_starter", "bench_order", "actual_points"]  # stored as REAL, exported as integers
+
+
+class ResultsStore:
+    """
+    The season's predictions, picked squads and scout picks in one SQLite
+    file, one row per (gw, player_id) in each table. Actual points live only
+    in predictions and are joined onto squads and scout picks when queried,
+    so filling them in after a GW is a single write.
+
+    The store is the record; the per-GW CSVs are exports of it (export()).
+    """
+
+    def __init__(self, path: str = RESULTS_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        for table, (cols, _) in TABLES.items():
+            types = ", ".join(f"{c} {'TEXT' if c in ('player_name', 'position') else 'REAL'}" for c in cols)
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS {table} "
+                              f"(gw INTEGER, player_id INTEGER, {types}, PRIMARY KEY (gw, player_id))")
+            # stores made before a column was added to TABLES
+            have = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+            for c in cols:
+                if c not in have:
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {c} REAL")
+        # mtime of each CSV when it was last imported or exported, to spot ones changed outside the store
+        self.conn.execute("CREATE TABLE IF NOT EXISTS csv_files (path TEXT PRIMARY KEY, mtime REAL)")
+        self.conn.commit()
+
+    def append(self, table: str, gw: int, df: pd.DataFrame):
+        """
+        Store one GW of table from df (player_id plus any of the table's
+        columns), replacing what was stored for that GW. Columns df does not
+        have keep their stored values, so re-running a prediction does not
+        wipe actual points already filled in.
+        """
+        cols = [c for c in TABLES[table][0] if c in df.columns]
+        rows = df[["player_id"] + cols].astype(object).where(df[["player_id"] + cols].notna(), None)
+        ids = [int(p) for p in rows["player_id"]]
+
+        self.conn.execute(f"DELETE FROM {table} WHERE gw = ? AND player_id NOT IN ({', '.join('?' * len(ids))})",
+                          [int(gw)] + ids)
+        update = ", ".join(f"{c} = excluded.{c}" for c in cols) or "player_id = excluded.player_id"
+        self.conn.executemany(
+            f"INSERT INTO {table} (gw, player_id{''.join(', ' + c for c in cols)}) "
+            f"VALUES ({', '.join('?' * (len(cols) + 2))}) ON CONFLICT (gw, player_id) DO UPDATE SET {update}",
+            [(int(gw), int(r[0]), *r[1:]) for r in rows.itertuples(index=False)],
+        )
+        self.conn.commit()
+
+    def query(self, table: str, gws: list = None) -> pd.DataFrame:
+        """Rows of table for gws (all GWs if None), with actual_points joined from predictions."""
+        where, args = "", []
+        if gws is not None:
+            where, args = f"WHERE t.gw IN ({', '.join('?' * len(gws))})", [int(g) for g in gws]
+        actual = "" if table == "predictions" else ", p.actual_points"
+        join = "" if table == "predictions" else "LEFT JOIN predictions p ON p.gw = t.gw AND p.player_id = t.player_id"
+        return pd.read_sql_query(f"SELECT t.*{actual} FROM {table} t {join} {where} ORDER BY t.gw", self.conn,
+                                 params=args)
+
+    def export(self, table: str, gw: int) -> str:
+        """
+        Write one GW of table (with actual points once they are filled in) to
+        its per-GW CSV and return the path.
+        """
+        df = self.query(table, [gw]).drop(columns="gw")
+        df.insert(2, "round", int(gw))
+        if table == "squads":
+            df = df.sort_values(["is_starter", "bench_order"], ascending=[False, True])
+        else:
+            df = df.sort_values("predicted_points", ascending=False)
+        for c in [c for c in INT_COLS if c in df.columns]:
+            df[c] = df[c].astype("Int64")
+        if df["actual_points"].isna().all():
+            df = df.drop(columns="actual_points")
+        path = TABLES[table][1].format(gw=int(gw))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df.to_csv(path, index=False)
+        self.mark_synced(path)
+        return path
+
+    def mark_synced(self, path: str):
+        """Record that the CSV at path matches the store as of its current mtime."""
+        self.conn.execute("INSERT OR REPLACE INTO csv_files (path, mtime) VALUES (?, ?)",
+                          (path, os.path.getmtime(path)))
+        self.conn.commit()
+
+    def synced_mtimes(self) -> dict:
+        return dict(self.conn.execute("SELECT path, mtime FROM csv_files"))
+
+    def gws(self, table: str) -> list:
+        return [g for (g,) in self.conn.execute(f"SELECT DISTINCT gw FROM {table} ORDER BY gw")]
+
+    def evaluated_gws(self) -> set:
+        """GWs whose actual points have been filled in."""
+        return {g for (g,) in self.conn.execute("SELECT DISTINCT gw FROM predictions WHERE actual_points IS NOT NULL")}
+
+    def season_scores(self, gws: list = None) -> pd.DataFrame:
+        """Actual points of the picked XI and of the scout picks per GW, in one query."""
+        where, args = "", []
+        if gws is not None:
+            where, args = f"WHERE g.gw IN ({', '.join('?' * len(gws))})", [int(g) for g in gws]
+        return pd.read_sql_query(f"""
+            WITH g AS (SELECT DISTINCT gw FROM squads UNION SELECT DISTINCT gw FROM scout_picks)
+            SELECT g.gw,
+                   (SELECT COALESCE(SUM(p.actual_points), 0) FROM squads s
+                    JOIN predictions p ON p.gw = s.gw AND p.player_id = s.player_id
+                    WHERE s.gw = g.gw AND s.is_starter = 1) AS xi_points,
+                   (SELECT COALESCE(SUM(p.actual_points), 0) FROM scout_picks c
+                    JOIN predictions p ON p.gw = c.gw AND p.player_id = c.player_id
+                    WHERE c.gw = g.gw) AS scout_points
+            FROM g {where} ORDER BY g.gw
+        """, self.conn, params=args)
+
+    def fingerprints(self) -> dict:
+        """GW -> hash of the rows season_scores() sums: squad (with starters) and scout ids and their actual points."""
+        rows = pd.read_sql_query("""
+            SELECT s.gw, 'squad' AS source, s.player_id, s.is_starter, p.actual_points FROM squads s
+            LEFT JOIN predictions p ON p.gw = s.gw AND p.player_id = s.player_id
+            UNION ALL
+            SELECT c.gw, 'scout', c.player_id, NULL, p.actual_points FROM scout_picks c
+            LEFT JOIN predictions p ON p.gw = c.gw AND p.player_id = c.player_id
+            ORDER BY 1, 2, 3
+        """, self.conn)
+        return {int(g): hashlib.sha1(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()[:16]
+                for g, df in rows.groupby("gw")}
+
+def import_csvs(store: ResultsStore = None, changed_only: bool = False) -> ResultsStore:
+    """
+    Import the per-GW predictions/squad/scout CSVs into the store (each
+    replaces its GW of the table). With changed_only, only CSVs that are new
+    or modified since the store last imported or exported them.
+    """
+    store = store if store is not None else ResultsStore()
+    synced = store.synced_mtimes() if changed_only else {}
+    for table, (_, pattern) in TABLES.items():
+        # exactly gw<N>_..., so neither the gw_ template nor a gw<N>_to_gw<M>_ horizon file matches
+        name = re.compile(re.escape(os.path.basename(pattern)).replace(re.escape("{gw}"), r"(\d+)"))
+        n = 0
+        for path in sorted(glob.glob(pattern.replace("{gw}", "*"))):
+            found = name.fullmatch(os.path.basename(path))
+            if found is None or os.path.getmtime(path) <= synced.get(path, -1):
+                continue
+            df = pd.read_csv(path).dropna(subset=["player_id"])
+            if table != "predictions":
+                df = df.drop(columns=["actual_points"], errors="ignore")
+            store.append(table, int(found.group(1)), df)
+            store.mark_synced(path)
+            n += 1
+        if n or not changed_only:
+            print(f"Imported {n} {table} files into {RESULTS_PATH}")
+    return store
+
+
+def open_store(path: str = RESULTS_PATH) -> ResultsStore:
+    """
+    The results store, after importing any CSV that is new or was changed
+    outside it (e.g. pulled from git or edited by hand; the store itself is
+    not tracked).
+    """
+    return import_csvs(ResultsStore(path), changed_only=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] != "--import":
+        raise SystemExit("Usage: python results_store.py --import")
+    import_csvs()
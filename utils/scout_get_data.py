@@ -1,18 +1,17 @@
-import requests
 import pandas as pd
 import sys 
 
 from utils.config import FEATURES, TARGET
 from utils.predictor import predict_gameweek
+from utils.fpl_api import get_json
+from utils.player_registry import registry_for
+from utils.results_store import open_store
 
 def evaluate_scout_picks(gw: int):
-    squad_path = f"scout_picks/gw{gw}_scout_picks.csv"
-    df = pd.read_csv(squad_path)
-
-    pred_path = f"data/gw{gw}_predicted_points.csv"
-    all_players = pd.read_csv(pred_path)[["player_id", "actual_points"]]
-
-    team = df.merge(all_players, on="player_id", how="left")
+    store = open_store()
+    team = store.query("scout_picks", [gw])
+    if team.empty:
+        raise SystemExit(f"No scout picks stored for GW{gw}.")
     team["actual_points"] = team["actual_points"].fillna(0)
 
     total_actual_points = team["actual_points"].sum()
@@ -22,20 +21,61 @@ def evaluate_scout_picks(gw: int):
     print(f"Total actual points for GW{gw} squad: {total_actual_points:.1f}")
     print(f"Difference: {total_actual_points - total_predicted_points:.1f}")
 
-    team.to_csv(squad_path, index=False)
+    squad_path = store.export("scout_picks", gw)
     print(f"Updated {squad_path} with actual_points column.")
 
+def scout_player_ids(picks: pd.DataFrame, players: pd.DataFrame) -> list:
+    """
+    Player ids of the scout picks, each once: the player_id column where it
+    is filled (ids not in players are skipped), else an exact web_name match.
+    A name shared by several players has to be given as a player_id instead.
+    """
+    ids = []
+    by_name = players.groupby("web_name")["id"].apply(list)
+    known = set(players["id"])
+    for pid, name in zip(picks["player_id"], picks["player_name"]):
+        if pd.notna(pid):
+            if int(pid) not in known:
+                print(f"Scout pick id {int(pid)} not found, skipping.")
+            elif int(pid) not in ids:
+                ids.append(int(pid))
+            continue
+        found = by_name.get(name, [])
+        if len(found) > 1:
+            raise SystemExit(f"Scout pick '{name}' matches players {found}; set its player_id instead.")
+        if not found:
+            print(f"Scout pick '{name}' not found, skipping.")
+            continue
+        if int(found[0]) not in ids:
+            ids.append(int(found[0]))
+    return ids
+
 def scout_get_data(gw: int, evaluate: bool = False):
-    data = requests.get("https://fantasy.premierleague.com/api/bootstrap-static/").json()
-    players = pd.DataFrame(data["elements"])
+    data = get_json("bootstrap-static/")
+    players = registry_for(data).frame()
+
+    picks = pd.read_csv(f"scout_picks/gw{gw}_scout_picks.csv")
+    ids = scout_player_ids(picks, players)
 
-    scout_picks = pd.read_csv(f"scout_picks/gw{gw}_scout_picks.csv")
-    scout_picks = players[players["web_name"].isin(scout_picks["player_name"])].copy()
+    # id join against the GW's stored predictions; only players main has not predicted go through the model
+    stored = open_store().query("predictions", [gw]).set_index("player_id")
+    have = [pid for pid in ids if pid in stored.index]
+    missing = [pid for pid in ids if pid not in stored.index]
 
-    predictions_df = predict_gameweek(data, scout_picks, gw, FEATURES, TARGET, N_RUNS=5)
+    cols = ["player_id", "player_name", "round", "predicted_points", "p10", "p50", "p90"]
+    predictions_df = stored.loc[have].reset_index().assign(round=gw)
+    n_predicted = 0
+    if missing:
+        predicted = predict_gameweek(data, players[players["id"].isin(missing)], gw, FEATURES, TARGET)
+        predictions_df = pd.concat([predictions_df, predicted], ignore_index=True)
+        n_predicted = predicted["player_id"].nunique() if not predicted.empty else 0
+    predictions_df = predictions_df.reindex(columns=cols)
+    print(f"Scout picks: {len(have)} from stored predictions, {n_predicted} predicted")
 
-    predictions_df.to_csv(f"scout_picks/gw{gw}_scout_picks.csv", index=False)
-    print(f"Updated scout_picks/gw{gw}_scout_picks.csv with predicted points and player IDs.")
+    store = open_store()
+    store.append("scout_picks", gw, predictions_df)
+    path = store.export("scout_picks", gw)
+    print(f"Updated {path} with predicted points and player IDs.")
 
     if evaluate:
         evaluate_scout_picks(gw)
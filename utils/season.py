@@ -0,0 +1,59 @@
+import pandas as pd
+
+from utils.fpl_api import get_json
+from utils.fixtures import load_fixture_index
+from utils.get_player_data import fetch_player_histories
+from utils.feature_rows import build_season_table, build_prediction_rows
+from utils.feature_store import FeatureStore
+from utils.player_registry import registry_for
+from utils import profiling
+
+class SeasonData:
+    """
+    Everything a prediction run fetches or derives from the API, built once
+    and shared by every gameweek predicted in the same process.
+
+    The long (player, round) table is built on first use and cached, so a
+    '-m' range pays for it only once.
+    """
+
+    def __init__(self, data: dict = None, players_df: pd.DataFrame = None):
+        self.data = data if data is not None else get_json("bootstrap-static/")
+        self.registry = registry_for(self.data)
+        self.players = self.registry.frame()
+        self.fixtures = load_fixture_index()
+
+        # players this run predicts for (everyone unless a subset was given)
+        self.scope = players_df if players_df is not None else self.players
+        with profiling.stage("fetch_histories"):
+            self.history_long = fetch_player_histories(self.scope["id"])
+        self._tables = {}
+
+    def table(self, FEATURES: list, TARGET: str) -> pd.DataFrame:
+        """The season's long (player, round) feature table for the players in scope."""
+        key = (tuple(FEATURES), TARGET)
+        if key not in self._tables:
+            with profiling.stage("feature_table"):
+                self._tables[key] = build_season_table(self.history_long, self.scope, self.fixtures, FEATURES, TARGET)
+        return self._tables[key]
+
+    def is_upcoming(self, gw: int, FEATURES: list, TARGET: str) -> bool:
+        """True for the normal weekly case: GW is not finished and no match on/after the current GW has been played."""
+        current = self.fixtures.current_gw
+        return gw >= current and not (self.table(FEATURES, TARGET)["round"] >= current).any()
+
+    def prediction_rows(self, players_df: pd.DataFrame, gw: int, FEATURES: list, TARGET: str) -> pd.DataFrame:
+        """
+        Prediction rows for GW. For an upcoming GW (nothing on or after the
+        current GW is in the table yet) they come from the on-disk feature
+        store, which first ingests any newly finished rounds; otherwise
+        (past GWs, or a GW still in progress) they are derived in memory.
+        """
+        table = self.table(FEATURES, TARGET)
+        if self.is_upcoming(gw, FEATURES, TARGET):
+            store = FeatureStore(FEATURES, TARGET, self.fixtures.season)
+            added = store.sync(table, self.fixtures.current_gw - 1)
+            if added:
+                print(f"Feature store: ingested {added} new match rows")
+            return store.prediction_rows(players_df, self.fixtures, gw)
+        return build_prediction_rows(table, players_df, self.fixtures, gw, FEATURES, TARGET)
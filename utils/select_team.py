@@ -1,13 +1,120 @@
 import pandas as pd
+import numpy as np
 import sys
-import pandas as pd
-
-def create_team(GW: int, predictions_df: pd.DataFrame, players: pd.DataFrame):
-
-    # --- prepare data with position + team + availability ---
+import time
+from scipy import sparse
+from scipy.optimize import milp, LinearConstraint, Bounds
+
+from utils.results_store import open_store
+
+BUDGET = 1000         # £100.0m, in now_cost units (tenths of £m)
+MAX_PER_CLUB = 3
+SQUAD_SLOTS = {"GK": 2, "DEF": 5, "MID": 5, "FWD": 3}
+XI_LIMITS = {"GK": (1, 1), "DEF": (3, 5), "MID": (2, 5), "FWD": (1, 3)}
+BENCH_WEIGHT = 0.1    # value of a bench player's points relative to a starter's
+
+
+def _undominated(df: pd.DataFrame) -> np.ndarray:
+    """
+    Mask of players worth offering to the solver. A player is dropped when
+    others in his position cost no more and score no less, and either
+    min(quota, MAX_PER_CLUB) of them are team-mates, or they come from
+    quota + 4 different clubs (at most 4 clubs can be full besides his).
+    Either way one of them is always free to take his place, so the optimum
+    is unchanged while the model shrinks to a fraction of its size.
+    """
+    keep = np.ones(len(df), dtype=bool)
+    for p, g in df.groupby("position"):
+        quota = SQUAD_SLOTS[p]
+        cost = g["now_cost"].to_numpy()
+        pts = g["predicted_points"].to_numpy()
+        clubs, club = np.unique(g["team"].to_numpy(), return_inverse=True)
+        order = np.arange(len(g))
+
+        # beats[i, j]: j is at least as good as i for no more money (ties broken by order)
+        beats = ((cost[None, :] <= cost[:, None]) & (pts[None, :] >= pts[:, None])
+                 & ((cost[None, :] < cost[:, None]) | (pts[None, :] > pts[:, None]) | (order[None, :] < order[:, None])))
+        same_club = (beats & (club[None, :] == club[:, None])).sum(axis=1)
+        n_clubs = (beats.astype(int) @ np.eye(len(clubs), dtype=int)[club] > 0).sum(axis=1)
+
+        dominated = (same_club >= min(quota, MAX_PER_CLUB)) | (n_clubs >= quota + 4)
+        keep[df.index.get_indexer(g.index)] = ~dominated
+    return keep
+
+
+def optimize_squad(df: pd.DataFrame, budget: int = BUDGET, bench_weight: float = BENCH_WEIGHT):
+    """
+    Exact 15-man squad + starting XI as one integer program (HiGHS via scipy.optimize.milp).
+
+    Maximises XI points plus bench_weight x bench points subject to the
+    budget, position quotas, max MAX_PER_CLUB per club and a legal formation.
+    df needs 'position', 'team', 'now_cost' and 'predicted_points'.
+
+    Returns (in_squad, is_starter) boolean arrays aligned with df and a dict
+    with 'status', 'objective', 'gap' (relative MIP gap), 'candidates'
+    (players left after dominance pruning) and 'solve_ms'.
+
+    Pruning leaves about a third of a 750-player pool; the solve then takes
+    roughly 30 ms to 1 s depending on the instance (the benchmark records it
+    as the squad_solve stage).
+    """
+    start = time.perf_counter()
+    keep = _undominated(df)
+    full_n, df = len(df), df[keep]
+    n = len(df)
+    pts = df["predicted_points"].to_numpy(dtype=float)
+    cost = df["now_cost"].to_numpy(dtype=float)
+    pos = df["position"].to_numpy()
+    club = df["team"].to_numpy()
+
+    # variables: [x_0..x_n-1 (in squad), s_0..s_n-1 (starts)]
+    c = -np.concatenate([bench_weight * pts, (1 - bench_weight) * pts])
+    rows, lb, ub = [], [], []
+
+    def add(coef_x, coef_s, lo, hi):
+        rows.append(np.concatenate([coef_x, coef_s]))
+        lb.append(lo)
+        ub.append(hi)
+
+    zeros = np.zeros(n)
+    add(cost, zeros, 0, budget)
+    add(zeros, np.ones(n), 11, 11)
+    for p, k in SQUAD_SLOTS.items():
+        mask = (pos == p).astype(float)
+        add(mask, zeros, k, k)
+        add(zeros, mask, *XI_LIMITS[p])
+    for t in np.unique(club):
+        add((club == t).astype(float), zeros, 0, MAX_PER_CLUB)
+
+    A = sparse.vstack([sparse.csr_matrix(np.array(rows)),
+                       sparse.hstack([-sparse.identity(n), sparse.identity(n)])])  # s_i <= x_i
+    lb = np.concatenate([lb, np.full(n, -np.inf)])
+    ub = np.concatenate([ub, np.zeros(n)])
+
+    res = milp(c, constraints=LinearConstraint(A, lb, ub), integrality=np.ones(2 * n),
+               bounds=Bounds(0, 1), options={"time_limit": 10})
+    info = {"status": res.message, "objective": None if res.x is None else -res.fun,
+            "gap": getattr(res, "mip_gap", None), "candidates": n,
+            "solve_ms": (time.perf_counter() - start) * 1000}
+    if res.x is None:
+        raise ValueError(f"No legal squad found: {res.message}")
+
+    x = res.x.round().astype(bool)
+    in_squad, starts = np.zeros(full_n, dtype=bool), np.zeros(full_n, dtype=bool)
+    in_squad[keep], starts[keep] = x[:n], x[n:]
+    return in_squad, starts, info
+
+
+def select_squad(predictions_df: pd.DataFrame, players: pd.DataFrame, budget: int = BUDGET) -> pd.DataFrame:
+    """
+    Pick the 15-man squad, starting XI and bench order from predicted points.
+    Solver details are left in the result's attrs['solve'].
+    """
+
+    # --- prepare data with position + team + price + availability ---
     pos_map = {1: "GK", 2: "DEF", 3: "MID", 4: "FWD"}
     df = predictions_df.merge(
-        players[["id", "element_type", "team", "status", "chance_of_playing_next_round"]],
+        players[["id", "element_type", "team", "now_cost", "status", "chance_of_playing_next_round"]],
         left_on="player_id", right_on="id", how="left"
     ).drop(columns=["id"]).copy()
     df["position"] = df["element_type"].map(pos_map)
@@ -20,31 +127,13 @@ def create_team(GW: int, predictions_df: pd.DataFrame, players: pd.DataFrame):
 
     # keep needed cols and clean
     df["predicted_points"] = pd.to_numeric(df["predicted_points"], errors="coerce").fillna(0.0)
-    df = df[["player_id","player_name","position","round","predicted_points","team"]].reset_index(drop=True)
-
-    # --- SQUAD: top-N per position (no team cap) ---
-    gks  = df.loc[df["position"] == "GK"].nlargest(2, "predicted_points")
-    defs = df.loc[df["position"] == "DEF"].nlargest(5, "predicted_points")
-    mids = df.loc[df["position"] == "MID"].nlargest(5, "predicted_points")
-    fwds = df.loc[df["position"] == "FWD"].nlargest(3, "predicted_points")
-
-    squad_df = pd.concat([gks, defs, mids, fwds], ignore_index=True).copy()
-
-    # --- STARTING XI: 1 GK, ≥3 DEF, ≥2 MID, ≥1 FWD, then best remaining ---
-    xi_idx = []
+    df = df.dropna(subset=["position", "now_cost"])
+    df = df[["player_id","player_name","position","round","predicted_points","team","now_cost"]].reset_index(drop=True)
 
-    # required minimums
-    xi_idx += list(squad_df[squad_df["position"]=="GK"].nlargest(1, "predicted_points").index)
-    xi_idx += list(squad_df.drop(index=xi_idx).loc[squad_df["position"]=="DEF"].nlargest(3, "predicted_points").index)
-    xi_idx += list(squad_df.drop(index=xi_idx).loc[squad_df["position"]=="MID"].nlargest(2, "predicted_points").index)
-    xi_idx += list(squad_df.drop(index=xi_idx).loc[squad_df["position"]=="FWD"].nlargest(1, "predicted_points").index)
-
-    # fill remaining slots to 11 with highest predicted points
-    need = 11 - len(xi_idx)
-    if need > 0:
-        xi_idx += list(squad_df.drop(index=xi_idx).nlargest(need, "predicted_points").index)
-
-    squad_df["is_starter"] = squad_df.index.isin(xi_idx).astype(int)
+    # --- SQUAD + STARTING XI: solved jointly under budget, club cap and formation ---
+    in_squad, starts, info = optimize_squad(df, budget)
+    squad_df = df[in_squad].copy()
+    squad_df["is_starter"] = starts[in_squad].astype(int)
 
     # (optional) bench ordering: GK first, then by predicted points
     bench = squad_df[squad_df["is_starter"]==0].copy()
@@ -56,25 +145,32 @@ def create_team(GW: int, predictions_df: pd.DataFrame, players: pd.DataFrame):
     starters_df = squad_df[squad_df["is_starter"]==1].copy()
     starters_df["bench_order"] = 0
     final = pd.concat([starters_df, bench], ignore_index=True)
+    final.attrs["solve"] = info
+    return final
+
+
+def create_team(GW: int, predictions_df: pd.DataFrame, players: pd.DataFrame):
+    final = select_squad(predictions_df, players)
+    info = final.attrs["solve"]
+    print(f"Squad optimizer: {info['objective']:.2f} pts objective, gap {info['gap'] or 0:.2%}, "
+          f"cost {final['now_cost'].sum() / 10:.1f}m, solved in {info['solve_ms']:.1f} ms")
 
     # save
-    squad_path = f"teams/gw{GW}_squad.csv"
-    cols = ["player_id","player_name","position","round", "is_starter","predicted_points"]
-    final[cols].to_csv(squad_path, index=False)
+    store = open_store()
+    store.append("squads", GW, final)
+    squad_path = store.export("squads", GW)
     print(f"Saved squad + lineup to {squad_path}")
+    return final
 
 
 
 
 def evaluate_team_performance(gameweek: int):
-    """Sum actual points of the chosen 15-man squad and update the file."""
-    squad_path = f"teams/gw{gameweek}_squad.csv"
-    df = pd.read_csv(squad_path)
-
-    pred_path = f"data/gw{gameweek}_predicted_points.csv"
-    all_players = pd.read_csv(pred_path)[["player_id", "actual_points"]]
-
-    team = df.merge(all_players, on="player_id", how="left")
+    """Sum actual points of the chosen 15-man squad and export it with them."""
+    store = open_store()
+    team = store.query("squads", [gameweek])
+    if team.empty:
+        raise SystemExit(f"No squad stored for GW{gameweek}.")
     team["actual_points"] = team["actual_points"].fillna(0)
 
     total_actual_points = team["actual_points"].sum()
@@ -99,7 +195,7 @@ def evaluate_team_performance(gameweek: int):
     print("-------------------------------")
     print()
 
-    team.to_csv(squad_path, index=False)
+    squad_path = store.export("squads", gameweek)
     print(f"Updated {squad_path} with actual_points column.")
 
     return total_actual_points
@@ -0,0 +1,172 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from utils.config import FEATURES, TARGET
+from utils.feature_store import played_share
+from utils.fixtures import load_fixture_index
+from utils.player_registry import registry_for
+from utils.results_store import open_store
+from utils.select_team import XI_LIMITS
+
+N_SIMS = 100_000
+TAIL = 0.5  # p0/p100 sit this far beyond p10/p90, relative to the p10-p50 / p50-p90 gaps
+
+_KNOTS = np.array([0.0, 0.1, 0.5, 0.9, 1.0])
+
+
+def _quantile_knots(mean: np.ndarray, p10: np.ndarray, p50: np.ndarray, p90: np.ndarray) -> np.ndarray:
+    """
+    (n_players, 5) values of a piecewise-linear quantile function through
+    p10/p50/p90, shifted so each player's distribution has the given mean.
+    """
+    lo, hi = np.minimum(p10, p50), np.maximum(p90, p50)
+    vals = np.column_stack([lo - TAIL * (p50 - lo), lo, p50, hi, hi + TAIL * (hi - p50)])
+    widths = np.diff(_KNOTS)
+    dist_mean = ((vals[:, :-1] + vals[:, 1:]) / 2 * widths).sum(axis=1)
+    return vals + (mean - dist_mean)[:, None]
+
+
+def _sample_points(knots: np.ndarray, u: np.ndarray) -> np.ndarray:
+    """Inverse-CDF draws: u is (n_sims, n_players) uniform, knots as from _quantile_knots."""
+    seg = np.clip(np.searchsorted(_KNOTS, u, side="right") - 1, 0, len(_KNOTS) - 2)
+    frac = (u - _KNOTS[seg]) / (_KNOTS[seg + 1] - _KNOTS[seg])
+    cols = np.arange(knots.shape[0])
+    a, b = knots[cols, seg], knots[cols, seg + 1]
+    return a + frac * (b - a)
+
+
+def _auto_subs(plays: np.ndarray, squad: pd.DataFrame) -> np.ndarray:
+    """
+    Mask (n_sims, 15) of the players whose points count after automatic
+    substitutions: the bench GK replaces a starting GK who does not play,
+    and bench outfielders come on in bench_order for absent starters as long
+    as the XI can still reach a legal formation (min 3 DEF, 2 MID, 1 FWD).
+    """
+    pos = squad["position"].to_numpy()
+    starter = squad["is_starter"].to_numpy() == 1
+    counted = plays & starter
+
+    gk = pos == "GK"
+    gk_in, gk_out = np.flatnonzero(gk & starter), np.flatnonzero(gk & ~starter)
+    if len(gk_in) and len(gk_out):
+        swap = ~plays[:, gk_in[0]] & plays[:, gk_out[0]]
+        counted[:, gk_out[0]] = swap
+
+    outfield = ["DEF", "MID", "FWD"]
+    count = {p: counted[:, pos == p].sum(axis=1) for p in outfield}
+    filled = sum(count.values())
+
+    bench = squad[(~starter) & (~gk)].sort_values("bench_order").index
+    for b in bench:
+        p = pos[b]
+        after = {q: count[q] + (q == p) for q in outfield}
+        empty_after = 10 - (filled + 1)
+        deficit = sum(np.maximum(0, XI_LIMITS[q][0] - after[q]) for q in outfield)
+        sub = plays[:, b] & (filled < 10) & (deficit <= empty_after)
+        counted[:, b] = sub
+        count[p] = count[p] + sub
+        filled = filled + sub
+    return counted
+
+
+def simulate_squad(squad: pd.DataFrame, n_sims: int = N_SIMS, seed: int = 0) -> dict:
+    """
+    Monte Carlo outcomes of one GW for a 15-man squad.
+
+    Parameters
+    ----------
+    squad : pd.DataFrame
+        create_team's squad: player_id, player_name, position, is_starter,
+        bench_order, predicted_points, p10, p50, p90 and play_prob (chance of
+        featuring at all). predicted_points is the expectation including the
+        chance of not playing; points given that he plays are drawn from the
+        p10/p50/p90 shape, rescaled to match it.
+    n_sims : int
+        Number of joint scenarios.
+
+    Returns
+    -------
+    dict
+        'totals': (n_sims,) squad totals for the best captain/vice pair,
+        'captains': one row per starter as captain, with his best vice and
+        the mean, p10 and p90 of the squad total, best first,
+        'captain'/'vice': the best pair's names, 'seconds': run time.
+    """
+    start = time.perf_counter()
+    squad = squad.reset_index(drop=True)
+    rng = np.random.default_rng(seed)
+
+    p_play = squad["play_prob"].clip(1e-6, 1).to_numpy()
+    cond = lambda c: squad[c].to_numpy() / p_play
+    knots = _quantile_knots(cond("predicted_points"), cond("p10"), cond("p50"), cond("p90"))
+
+    plays = rng.random((n_sims, len(squad))) < p_play
+    points = np.where(plays, _sample_points(knots, rng.random((n_sims, len(squad)))), 0.0)
+    counted = _auto_subs(plays, squad)
+    base = (points * counted).sum(axis=1)
+
+    # captain doubles; if he does not feature the vice-captain doubles instead.
+    # mean bonus of every (captain, vice) pair at once: E[c counts]*pts_c + E[c absent, v counts]*pts_v
+    scored = points * counted
+    own = scored.mean(axis=0)
+    cover = (~counted).T.astype(float) @ scored / n_sims
+    starters = np.flatnonzero(squad["is_starter"].to_numpy() == 1)
+
+    rows = []
+    for c in starters:
+        vices = starters[starters != c]
+        v = vices[np.argmax(cover[c, vices])]
+        total = base + np.where(counted[:, c], points[:, c], scored[:, v])
+        rows.append({"captain": squad.at[c, "player_name"], "vice": squad.at[v, "player_name"],
+                     "mean": base.mean() + own[c] + cover[c, v],
+                     "p10": np.percentile(total, 10), "p90": np.percentile(total, 90), "_total": total})
+
+    captains = pd.DataFrame(rows).sort_values("mean", ascending=False).reset_index(drop=True)
+    best = captains.iloc[0]
+    return {"totals": best["_total"], "captains": captains.drop(columns="_total"), "captain": best["captain"],
+            "vice": best["vice"], "seconds": time.perf_counter() - start}
+
+
+def play_probabilities(player_ids, gw: int, data: dict = None) -> np.ndarray:
+    """
+    Chance each player features in GW: the API's chance of playing (current
+    and next GW only) times his share of matches played in the rounds
+    before GW, read from the feature store when it has him (else 1).
+    """
+    fixtures = load_fixture_index()
+    chance = registry_for(data).play_factors(player_ids, gw, fixtures.current_gw)
+    rate = played_share(FEATURES, TARGET, fixtures.season, gw).reindex(player_ids).fillna(1).to_numpy()
+    return chance * rate
+
+
+def simulate_gameweek(gw: int, n_sims: int = N_SIMS) -> dict:
+    """Simulate the stored squad for GW using that GW's stored predictions."""
+    store = open_store()
+    squad = store.query("squads", [gw]).drop(columns=["gw", "actual_points"])
+    if squad.empty:
+        raise SystemExit(f"No squad stored for GW{gw}.")
+    preds = store.query("predictions", [gw])
+    squad = squad.drop(columns=["predicted_points"]).merge(
+        preds[["player_id", "predicted_points", "p10", "p50", "p90"]], on="player_id", how="left"
+    ).fillna({"predicted_points": 0.0, "p10": 0.0, "p50": 0.0, "p90": 0.0})
+    if squad["bench_order"].isna().any():
+        # squads imported from older files: the bench was already written in bench order
+        squad["bench_order"] = (squad["is_starter"] == 0).cumsum().where(squad["is_starter"] == 0, 0)
+    squad["play_prob"] = play_probabilities(squad["player_id"], gw)
+
+    result = simulate_squad(squad, n_sims)
+    totals = result["totals"]
+    print(f"GW{gw} simulation ({n_sims} scenarios, {result['seconds']:.2f}s): "
+          f"mean {totals.mean():.1f}, p10 {np.percentile(totals, 10):.1f}, p90 {np.percentile(totals, 90):.1f}")
+    print(f"Best captain: {result['captain']} (vice {result['vice']})")
+    return result
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        raise SystemExit("Usage: python simulate.py <GW> [n_sims]")
+
+    gw = int(sys.argv[1])
+    simulate_gameweek(gw, int(sys.argv[2]) if len(sys.argv) > 2 else N_SIMS)
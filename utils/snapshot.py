@@ -0,0 +1,155 @@
+import json
+import os
+import random
+import sys
+import time
+
+from utils import fpl_api
+from utils.fpl_api import get_json
+
+N_TEAMS = 20
+FINISHED = 10
+POSITION_CYCLE = [1, 2, 2, 2, 3, 3, 3, 3, 4, 4]  # element_type mix of a real squad list
+
+
+def _put(dest: str, key: str, body):
+    """Write one response into dest in the on-disk cache layout, so set_offline(dest) replays it."""
+    fp = fpl_api._cache_file(key, dest)
+    os.makedirs(os.path.dirname(fp), exist_ok=True)
+    with open(fp, "w") as f:
+        json.dump({"path": key, "fetched_at": time.time(), "etag": None, "last_modified": None, "body": body}, f)
+
+
+def _get(src: str, key: str):
+    with open(fpl_api._cache_file(key, src)) as f:
+        return json.load(f)["body"]
+
+
+def capture_snapshot(dest: str):
+    """
+    Fetch every response a season run needs (bootstrap, fixtures, all
+    element summaries and the live payload of each finished GW) and save
+    them to dest for offline replay.
+    """
+    data = get_json("bootstrap-static/")
+    get_json("fixtures/")
+    for e in data["elements"]:
+        get_json(f"element-summary/{e['id']}/")
+    for ev in data["events"]:
+        if ev.get("finished"):
+            get_json(f"event/{ev['id']}/live/")
+    fpl_api.save_snapshot(dest)
+
+
+def synthetic_snapshot(dest: str, n_players: int = 700, finished: int = FINISHED, seed: int = 0) -> str:
+    """
+    Write a made-up season with n_players (spread over 20 clubs) to dest:
+    bootstrap, a 38-GW fixture list with GW1..finished played, every
+    player's match history and the live payload of each finished GW.
+    """
+    rng = random.Random(seed)
+    teams = [{"id": t, "name": f"Team {t}", "short_name": f"T{t:02d}"} for t in range(1, N_TEAMS + 1)]
+
+    elements = []
+    for pid in range(1, n_players + 1):
+        elements.append({
+            "id": pid, "web_name": f"Player {pid}", "first_name": "Player", "second_name": str(pid),
+            "team": (pid - 1) % N_TEAMS + 1,
+            "element_type": POSITION_CYCLE[((pid - 1) + (pid - 1) // N_TEAMS) % len(POSITION_CYCLE)],
+            "now_cost": rng.randint(40, 130), "status": rng.choice("aaaaaaaidu"),
+            "chance_of_playing_next_round": rng.choice([None, None, None, 100, 75, 25, 0]),
+            "chance_of_playing_this_round": rng.choice([None, None, None, 100, 50]),
+            "total_points": 0,
+        })
+    events = [{"id": g, "average_entry_score": rng.randint(40, 70), "finished": g <= finished} for g in range(1, 39)]
+
+    fixtures = []
+    for g in range(1, 39):
+        order = list(range(1, N_TEAMS + 1))
+        rng.shuffle(order)
+        for h, a in zip(order[::2], order[1::2]):
+            played = g <= finished
+            fixtures.append({
+                "id": len(fixtures) + 1, "event": g, "team_h": h, "team_a": a,
+                "team_h_difficulty": rng.randint(2, 5), "team_a_difficulty": rng.randint(2, 5),
+                "finished": played, "finished_provisional": played,
+                "team_h_score": rng.randint(0, 3) if played else None,
+                "team_a_score": rng.randint(0, 3) if played else None,
+                "kickoff_time": f"2025-{8 + (g - 1) // 4:02d}-{1 + 7 * ((g - 1) % 4):02d}T15:00:00Z",
+            })
+
+    _put(dest, "bootstrap-static/", {"elements": elements, "teams": teams, "events": events})
+    _put(dest, "fixtures/", fixtures)
+
+    live = {g: {} for g in range(1, finished + 1)}
+    for e in elements:
+        history = []
+        for fx in fixtures:
+            if not fx["finished"] or e["team"] not in (fx["team_h"], fx["team_a"]) or rng.random() < 0.2:
+                continue
+            home = fx["team_h"] == e["team"]
+            minutes, points = rng.choice([90, 90, 90, 60, 20]), rng.randint(-1, 12)
+            history.append({
+                "element": e["id"], "fixture": fx["id"], "round": fx["event"], "was_home": home,
+                "opponent_team": fx["team_a"] if home else fx["team_h"], "kickoff_time": fx["kickoff_time"],
+                "team_h_score": fx["team_h_score"], "team_a_score": fx["team_a_score"],
+                "minutes": minutes, "total_points": points, "goals_scored": rng.randint(0, 2),
+                "assists": rng.randint(0, 1), "clean_sheets": rng.randint(0, 1), "goals_conceded": rng.randint(0, 3),
+                "own_goals": 0, "penalties_saved": 0, "penalties_missed": 0, "yellow_cards": rng.randint(0, 1),
+                "red_cards": 0, "saves": rng.randint(0, 4) if e["element_type"] == 1 else 0,
+                "bonus": rng.randint(0, 3), "bps": rng.randint(0, 30),
+                "influence": f"{rng.random() * 50:.1f}", "creativity": f"{rng.random() * 50:.1f}",
+                "threat": f"{rng.random() * 50:.1f}", "ict_index": f"{rng.random() * 10:.1f}",
+                "expected_goals": f"{rng.random():.2f}", "expected_assists": f"{rng.random():.2f}",
+                "expected_goal_involvements": f"{rng.random():.2f}", "expected_goals_conceded": f"{rng.random():.2f}",
+            })
+            stats = live[fx["event"]].setdefault(e["id"], {"total_points": 0, "minutes": 0})
+            stats["total_points"] += points
+            stats["minutes"] += minutes
+        _put(dest, f"element-summary/{e['id']}/", {"history": history, "fixtures": []})
+
+    for g, stats in live.items():
+        _put(dest, f"event/{g}/live/", {"elements": [{"id": i, "stats": s} for i, s in stats.items()]})
+    print(f"Wrote synthetic snapshot: {n_players} players, GW1-{finished} played, to {dest}")
+    return dest
+
+
+def scale_snapshot(src: str, dest: str, factor: int) -> str:
+    """
+    Copy the snapshot in src to dest with every player cloned factor times
+    (new ids, same club, position, price and match history), so the
+    pipeline can be timed at factor x the player count of a real season.
+    """
+    data = _get(src, "bootstrap-static/")
+    step = max(e["id"] for e in data["elements"])
+    finished = [ev["id"] for ev in data["events"] if ev.get("finished")]
+
+    clones = {k: [] for k in range(factor)}
+    for e in data["elements"]:
+        summary = _get(src, f"element-summary/{e['id']}/")
+        for k in range(factor):
+            pid = e["id"] + k * step
+            clones[k].append(dict(e, id=pid, web_name=e["web_name"] if k == 0 else f"{e['web_name']} {k + 1}"))
+            history = [dict(r, element=pid) for r in summary.get("history", [])]
+            _put(dest, f"element-summary/{pid}/", dict(summary, history=history))
+
+    elements = [e for k in range(factor) for e in clones[k]]
+    _put(dest, "bootstrap-static/", dict(data, elements=elements))
+    _put(dest, "fixtures/", _get(src, "fixtures/"))
+    for g in finished:
+        live = _get(src, f"event/{g}/live/")
+        _put(dest, f"event/{g}/live/", dict(live, elements=[
+            dict(e, id=e["id"] + k * step) for k in range(factor) for e in live["elements"]
+        ]))
+    print(f"Wrote {factor}x snapshot ({len(elements)} players) to {dest}")
+    return dest
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ["--capture", "--synthetic"]:
+        raise SystemExit("Usage: python snapshot.py --capture <dir> | --synthetic <dir> [n_players]")
+
+    if sys.argv[1] == "--capture":
+        capture_snapshot(sys.argv[2])
+    else:
+        synthetic_snapshot(sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else 700)
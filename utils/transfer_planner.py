@@ -0,0 +1,239 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from utils.select_team import BUDGET, MAX_PER_CLUB, SQUAD_SLOTS
+from utils.results_store import open_store
+
+HIT_COST = 4          # points per transfer beyond the free ones
+MAX_FREE_TRANSFERS = 5
+MAX_TRANSFERS = 2     # transfers considered per GW
+BEAM_WIDTH = 40       # plans kept after each GW
+BUYS_PER_SALE = 3     # best affordable replacements tried for each squad player
+PAIR_POOL = 12        # best single moves combined into double transfers
+
+POSITIONS = list(SQUAD_SLOTS)  # squad tuples are ordered GK, DEF, MID, FWD
+
+
+class _Horizon:
+    """
+    Predicted points of every player for each GW of the horizon, as arrays
+    indexed by a dense player index, plus a memo of squad scores.
+    """
+
+    def __init__(self, predictions: dict, players: pd.DataFrame, squad_ids: list):
+        self.gws = sorted(predictions)
+        pos_map = {1: "GK", 2: "DEF", 3: "MID", 4: "FWD"}
+        meta = players.set_index("id")
+
+        ids = set(squad_ids)
+        for df in predictions.values():
+            ids.update(df["player_id"])
+        self.ids = np.array(sorted(i for i in ids if i in meta.index))
+        self.index = {pid: k for k, pid in enumerate(self.ids)}
+
+        meta = meta.loc[self.ids]
+        self.pos = meta["element_type"].map(pos_map).map(POSITIONS.index).to_numpy()
+        self.club = meta["team"].to_numpy()
+        self.cost = meta["now_cost"].to_numpy()
+
+        # points[k, h]: expected points of player k in self.gws[h] (0 when not predicted: blank or no data)
+        self.points = np.zeros((len(self.ids), len(self.gws)))
+        for h, gw in enumerate(self.gws):
+            df = predictions[gw]
+            at = [self.index[p] for p in df["player_id"] if p in self.index]
+            self.points[at, h] = df.loc[df["player_id"].isin(self.index), "predicted_points"].to_numpy()
+
+        self._scores = {}
+
+    def squad_key(self, members) -> tuple:
+        return tuple(sorted(members, key=lambda k: (self.pos[k], k)))
+
+    def scores(self, squad: tuple) -> np.ndarray:
+        """Best XI points plus captain for every GW of the horizon (memoized per squad)."""
+        found = self._scores.get(squad)
+        if found is not None:
+            return found
+
+        gk = self.points[list(squad[:2])].max(axis=0)  # squad is position-ordered
+        defs, mids, fwds = (-np.sort(-self.points[list(squad[a:b])], axis=0)
+                            for a, b in [(2, 7), (7, 12), (12, 15)])
+        # 1 GK + 3 DEF + 2 MID + 1 FWD are forced; the best 4 of the other 7 outfielders fill the XI
+        rest = -np.sort(-np.vstack([defs[3:], mids[2:], fwds[1:]]), axis=0)
+        xi = gk + defs[:3].sum(axis=0) + mids[:2].sum(axis=0) + fwds[0] + rest[:4].sum(axis=0)
+        captain = np.maximum(gk, np.maximum(defs[0], np.maximum(mids[0], fwds[0])))
+
+        found = xi + captain
+        self._scores[squad] = found
+        return found
+
+
+def _buy_options(hz: _Horizon, h: int) -> list:
+    """Players of each position sorted by points over the rest of the horizon (from GW index h)."""
+    value = hz.points[:, h:].sum(axis=1)
+    return [np.flatnonzero(hz.pos == p)[np.argsort(-value[hz.pos == p], kind="stable")]
+            for p in range(len(POSITIONS))], value
+
+
+def _moves(hz: _Horizon, squad: tuple, bank: int, options: list, value: np.ndarray) -> list:
+    """Candidate transfer sets (tuples of (out, in)) for one GW: none, singles and doubles."""
+    members = set(squad)
+    clubs = {}
+    for k in squad:
+        clubs[hz.club[k]] = clubs.get(hz.club[k], 0) + 1
+
+    singles = []
+    for out in squad:
+        found = 0
+        for buy in options[hz.pos[out]]:
+            if value[buy] <= value[out]:
+                break
+            if buy in members or hz.cost[buy] > bank + hz.cost[out]:
+                continue
+            if hz.club[buy] != hz.club[out] and clubs.get(hz.club[buy], 0) >= MAX_PER_CLUB:
+                continue
+            singles.append((value[buy] - value[out], out, buy))
+            found += 1
+            if found == BUYS_PER_SALE:
+                break
+    singles.sort(reverse=True)
+
+    moves = [()] + [((out, buy),) for _, out, buy in singles]
+    if MAX_TRANSFERS < 2:
+        return moves
+
+    top = singles[:PAIR_POOL]
+    for a in range(len(top)):
+        for b in range(a + 1, len(top)):
+            (_, o1, b1), (_, o2, b2) = top[a], top[b]
+            if o1 == o2 or b1 == b2:
+                continue
+            if hz.cost[b1] + hz.cost[b2] > bank + hz.cost[o1] + hz.cost[o2]:
+                continue
+            after = dict(clubs)
+            for o, i in [(o1, b1), (o2, b2)]:
+                after[hz.club[o]] -= 1
+                after[hz.club[i]] = after.get(hz.club[i], 0) + 1
+            if max(after.values()) > MAX_PER_CLUB:
+                continue
+            moves.append(((o1, b1), (o2, b2)))
+    return moves
+
+
+def plan_transfers(squad_ids: list, predictions: dict, players: pd.DataFrame,
+                   free_transfers: int = 1, bank: int = None):
+    """
+    Beam search over transfer sequences for the GWs in predictions.
+
+    Parameters
+    ----------
+    squad_ids : list
+        The 15 player ids currently owned.
+    predictions : dict
+        GW -> DataFrame with 'player_id' and 'predicted_points'.
+    players : pd.DataFrame
+        bootstrap-static elements (id, element_type, team, now_cost, web_name).
+    free_transfers : int
+        Free transfers available for the first GW of the horizon.
+    bank : int, optional
+        Money in the bank in now_cost units; defaults to BUDGET minus the
+        squad's current value (selling prices are taken as now_cost).
+
+    Returns
+    -------
+    (list, float)
+        One dict per GW for the best plan found (transfers as (out id, in id)
+        pairs, free transfers, hits, bank, expected points and squad ids),
+        and its total expected points.
+    """
+    hz = _Horizon(predictions, players, squad_ids)
+    unknown = [p for p in squad_ids if p not in hz.index]
+    if unknown or len(squad_ids) != sum(SQUAD_SLOTS.values()):
+        raise ValueError(f"Current squad must be 15 known players (unknown ids: {unknown}).")
+    start = tuple(hz.index[p] for p in squad_ids)
+    start = hz.squad_key(start)
+    if bank is None:
+        bank = max(0, BUDGET - int(hz.cost[list(start)].sum()))
+
+    # beam entry: (realised points so far, squad, bank, free transfers, steps taken)
+    beam = [(0.0, start, int(bank), int(free_transfers), [])]
+    for h, gw in enumerate(hz.gws):
+        options, value = _buy_options(hz, h)
+        best = {}
+        for total, squad, money, ft, steps in beam:
+            for move in _moves(hz, squad, money, options, value):
+                members = set(squad)
+                for out, buy in move:
+                    members.discard(out)
+                    members.add(buy)
+                new = hz.squad_key(members)
+                new_bank = money + int(sum(hz.cost[o] - hz.cost[i] for o, i in move))
+
+                hits = max(0, len(move) - ft)
+                gained = hz.scores(new)[h] - HIT_COST * hits
+                next_ft = min(MAX_FREE_TRANSFERS, max(ft - len(move), 0) + 1)
+
+                key = (new, new_bank, next_ft)
+                step = {"gw": gw, "move": move, "free_transfers": ft, "hits": hits,
+                        "bank": new_bank, "expected_points": gained, "squad": new}
+                if key not in best or best[key][0] < total + gained:
+                    best[key] = (total + gained, new, new_bank, next_ft, steps + [step])
+
+        # rank by points banked so far plus what the squad would score over the rest of the horizon unchanged
+        beam = sorted(best.values(), key=lambda s: s[0] + hz.scores(s[1])[h + 1:].sum(), reverse=True)[:BEAM_WIDTH]
+
+    total, _, _, _, steps = beam[0]
+    for step in steps:
+        step["move"] = [(int(hz.ids[o]), int(hz.ids[i])) for o, i in step["move"]]
+        step["squad"] = [int(hz.ids[k]) for k in step["squad"]]
+    print(f"Transfer search: {len(hz._scores)} squads scored over {len(hz.gws)} GWs")
+    return steps, total
+
+
+def create_transfer_plan(GW: int, predictions: dict, players: pd.DataFrame, free_transfers: int = 1,
+                         bank: int = None):
+    """
+    Plan transfers for the GWs in predictions starting from the squad picked
+    for GW-1 and save them to teams/gw{GW}_transfer_plan.csv (one row per
+    transfer, or a single row for a GW where the free transfer is rolled).
+    """
+    squad = open_store().query("squads", [GW - 1])
+    if squad.empty:
+        raise SystemExit(f"No squad stored for GW{GW - 1}; the transfer plan starts from it.")
+
+    start = time.perf_counter()
+    steps, total = plan_transfers(list(squad["player_id"]), predictions, players, free_transfers, bank)
+    secs = time.perf_counter() - start
+    names = players.set_index("id")["web_name"]
+
+    rows = []
+    for step in steps:
+        base = {"round": step["gw"], "free_transfers": step["free_transfers"], "hit_cost": HIT_COST * step["hits"],
+                "bank": step["bank"] / 10, "expected_points": round(step["expected_points"], 2)}
+        if not step["move"]:
+            rows.append({**base, "player_out_id": None, "player_out": None, "player_in_id": None, "player_in": None})
+        for out, buy in step["move"]:
+            rows.append({**base, "player_out_id": out, "player_out": names.get(out),
+                         "player_in_id": buy, "player_in": names.get(buy)})
+
+    cols = ["round", "player_out_id", "player_out", "player_in_id", "player_in",
+            "free_transfers", "hit_cost", "bank", "expected_points"]
+    plan = pd.DataFrame(rows, columns=cols)
+    plan_path = f"teams/gw{GW}_transfer_plan.csv"
+    plan.to_csv(plan_path, index=False)
+
+    n_moves = sum(len(s["move"]) for s in steps)
+    print(f"Transfer plan GW{steps[0]['gw']}-{steps[-1]['gw']}: {n_moves} transfers, "
+          f"{total:.2f} expected points (searched in {secs:.2f}s)")
+    print(f"Saved transfer plan to {plan_path}")
+    return plan
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        raise SystemExit("Usage: python transfer_planner.py <GW> [horizon]")
+
+    from utils.main import plan
+    gw = int(sys.argv[1])
+    plan(gw, int(sys.argv[2]) if len(sys.argv) > 2 else 6)
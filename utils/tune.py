@@ -0,0 +1,233 @@
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+
+from utils.backtest import walk_forward_frames, _fit_predict
+from utils.config import FEATURES, TARGET
+from utils.evaluate import prediction_metrics
+from utils.models import save_model_config
+from utils.season import SeasonData
+
+TRIALS_PATH = os.environ.get("FPL_TUNING_DB", "cache/tuning.sqlite")
+METHODS = ["grid", "random", "halving"]
+N_TRIALS = 20
+ETA = 3  # successive halving keeps the best 1/ETA of the candidates per rung and gives them ETA x the GWs
+
+# backend -> parameter -> candidate values
+SPACES = {
+    "forest": {"n_estimators": [100, 200, 400], "min_samples_leaf": [1, 3, 10], "max_features": [1.0, 0.5, "sqrt"]},
+    "hist_gb": {"max_iter": [100, 200, 400], "learning_rate": [0.03, 0.05, 0.1], "min_samples_leaf": [5, 20],
+                "max_leaf_nodes": [15, 31]},
+    "ridge": {"alpha": [0.1, 1.0, 10.0, 100.0]},
+    "poisson": {"alpha": [0.01, 0.1, 1.0, 10.0]},
+}
+
+
+class TrialStore:
+    """
+    Finished trials on disk, keyed by a hash of the trial's config, the GWs
+    it was scored on and the data it saw, so an interrupted or repeated
+    search only runs the trials it has not scored yet.
+    """
+
+    def __init__(self, path: str = TRIALS_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS trials (key TEXT PRIMARY KEY, result TEXT)")
+        self.conn.commit()
+
+    def get(self, keys: list) -> dict:
+        found = {}
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            cur = self.conn.execute(f"SELECT key, result FROM trials WHERE key IN ({', '.join('?' * len(chunk))})", chunk)
+            found.update({k: json.loads(r) for k, r in cur})
+        return found
+
+    def put(self, key: str, result: dict):
+        self.conn.execute("INSERT OR REPLACE INTO trials VALUES (?, ?)", (key, json.dumps(result)))
+        self.conn.commit()
+
+
+def candidates(backends: list = None, spaces: dict = SPACES) -> list:
+    """Every (backend, parameter combination) of the search space, as backtest configs without 'kind'."""
+    out = []
+    for backend in backends or list(spaces):
+        if backend not in spaces:
+            raise ValueError(f"No search space for backend '{backend}'; choose from {', '.join(spaces)}.")
+        space = spaces[backend]
+        for values in itertools.product(*space.values()):
+            out.append({"backend": backend, **dict(zip(space, values))})
+    return out
+
+
+def _fingerprint(frames: dict) -> str:
+    """Hash of the training and prediction rows of every GW, so trials on changed data are not reused."""
+    h = hashlib.sha1()
+    for gw, (train, pred) in sorted(frames.items()):
+        h.update(str(gw).encode())
+        h.update(pd.util.hash_pandas_object(train, index=False).to_numpy().tobytes())
+        h.update(pd.util.hash_pandas_object(pred, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+def _trial_key(cfg: dict, gws: list, data: str) -> str:
+    return hashlib.sha1(json.dumps({"cfg": cfg, "gws": gws, "data": data}, sort_keys=True).encode()).hexdigest()
+
+
+_frames = None
+_n_jobs = -1
+
+def _init_worker(frames: dict, n_jobs: int):
+    global _frames, _n_jobs
+    _frames, _n_jobs = frames, n_jobs
+
+
+def _run_trial(cfg: dict, gws: list) -> dict:
+    """MAE of cfg on each of gws (walk-forward) and its total fit/predict seconds."""
+    maes, fit_secs, predict_secs = [], 0.0, 0.0
+    for gw in gws:
+        train, pred = _frames[gw]
+        per_match, fit_s, predict_s, _ = _fit_predict(cfg, train, pred, FEATURES, TARGET, n_jobs=_n_jobs)
+        preds = pd.DataFrame({"predicted_points": per_match * pred["n_fixtures"], "actual_points": pred["actual_points"]})
+        maes.append(prediction_metrics(preds)[0])
+        fit_secs, predict_secs = fit_secs + fit_s, predict_secs + predict_s
+    return {"mae": float(np.mean(maes)), "mae_per_gw": dict(zip(map(str, gws), map(float, maes))),
+            "fit_seconds": fit_secs, "predict_seconds": predict_secs}
+
+
+def _evaluate(configs: list, gws: list, frames: dict, store: TrialStore, data: str, n_workers: int) -> list:
+    """Score every config on gws, reusing stored trials; returns one result dict per config, in order."""
+    keys = [_trial_key(cfg, gws, data) for cfg in configs]
+    results = store.get(keys)
+    todo = [(k, cfg) for k, cfg in zip(keys, configs) if k not in results]
+    print(f"  {len(configs)} trials on {len(gws)} GWs: {len(configs) - len(todo)} from the trial store, "
+          f"{len(todo)} to run")
+
+    if n_workers <= 1:
+        _init_worker(frames, -1)
+        for k, cfg in todo:
+            results[k] = _run_trial(cfg, gws)
+            store.put(k, results[k])
+    elif todo:
+        # each trial is stored as soon as it finishes, so an interrupted search keeps its progress
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(frames, 1)) as pool:
+            futures = {pool.submit(_run_trial, cfg, gws): k for k, cfg in todo}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                store.put(futures[future], results[futures[future]])
+    return [dict(results[k], config=cfg) for k, cfg in zip(keys, configs)]
+
+
+def search(method: str = "random", mode: str = "player", backends: list = None, n_trials: int = N_TRIALS,
+           start: int = None, end: int = None, n_workers: int = 1, seed: int = 0,
+           season: SeasonData = None) -> tuple:
+    """
+    Hyperparameter search over the backends' spaces, scored by walk-forward
+    MAE over GWs start..end (default: GW4 to the last finished GW).
+
+    Parameters
+    ----------
+    method : str
+        'grid' (every candidate), 'random' (n_trials sampled candidates) or
+        'halving' (n_trials sampled candidates scored on the most recent
+        GWs first; the best 1/ETA go on to ETA x as many GWs).
+    mode : str
+        'player' (one model per player, the default as in run.py) or
+        'pooled' (one model over all players; -p on the command line).
+
+    The season's training and prediction rows for every GW are built once
+    and shared with the worker processes. Returns (best result, path of its
+    config file: a new version, or the latest one if that already matches).
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown search method '{method}'; choose from {', '.join(METHODS)}.")
+    if season is None:
+        season = SeasonData()
+    if end is None:
+        end = max((e["id"] for e in season.data["events"] if e.get("finished")), default=0)
+    start = 4 if start is None else start
+
+    t0 = time.perf_counter()
+    frames = {gw: (train, pred) for gw, train, pred in walk_forward_frames(season, start, end, FEATURES, TARGET)}
+    if not frames:
+        raise SystemExit(f"No GWs with data between GW{start} and GW{end}.")
+    gws = sorted(frames)
+    data = _fingerprint(frames)
+    print(f"Feature rows for GW{gws[0]}-{gws[-1]} built in {time.perf_counter() - t0:.1f}s")
+
+    pool = [dict(cfg, kind=mode) for cfg in candidates(backends)]
+    if method != "grid" and len(pool) > n_trials:
+        pool = random.Random(seed).sample(pool, n_trials)
+    store = TrialStore()
+    n_candidates = len(pool)
+
+    if method == "halving":
+        rungs = max(0, math.ceil(math.log(len(pool), ETA)) - 1) if len(pool) > 1 else 0
+        budget = max(1, math.ceil(len(gws) / ETA ** rungs))
+        while True:
+            recent = gws[-budget:]
+            print(f"Halving rung: {len(pool)} candidates, GW{recent[0]}-{recent[-1]}")
+            results = sorted(_evaluate(pool, recent, frames, store, data, n_workers), key=lambda r: r["mae"])
+            if budget >= len(gws) or len(pool) == 1:
+                break
+            pool = [r["config"] for r in results[:max(1, math.ceil(len(pool) / ETA))]]
+            budget = min(len(gws), budget * ETA)
+    else:
+        print(f"{method.capitalize()} search: {len(pool)} candidates")
+        results = sorted(_evaluate(pool, gws, frames, store, data, n_workers), key=lambda r: r["mae"])
+
+    print(f"\n{'mae':>7}{'fit s':>9}  config")
+    for r in results[:10]:
+        params = {k: v for k, v in r["config"].items() if k != "kind"}
+        print(f"{r['mae']:>7.3f}{r['fit_seconds']:>9.2f}  {params}")
+
+    best = results[0]
+    cfg = best["config"]
+    path = save_model_config({
+        "mode": mode, "backend": cfg["backend"],
+        "params": {k: v for k, v in cfg.items() if k not in ("kind", "backend")},
+        "search": {"method": method, "gws": [gws[0], gws[-1]], "mae": round(best["mae"], 4),
+                   "candidates": n_candidates, "created": time.strftime("%Y-%m-%dT%H:%M:%S")},
+    })
+    print(f"Best: {cfg['backend']} with MAE {best['mae']:.3f}; config in {path}")
+    print(f"Use it with: python run.py <GW> --config {path}")
+    return best, path
+
+
+if __name__ == "__main__":
+    usage = "Usage: python tune.py <grid|random|halving> [-p] [-n trials] [-j workers] [-g start end] [-b backend,...]"
+    if len(sys.argv) < 2 or sys.argv[1] not in METHODS:
+        raise SystemExit(usage)
+
+    args, i = {}, 2
+    while i < len(sys.argv):
+        if sys.argv[i] == "-p":
+            i += 1
+        elif sys.argv[i] == "-g" and i + 2 < len(sys.argv):
+            args["-g"] = (int(sys.argv[i + 1]), int(sys.argv[i + 2]))
+            i += 3
+        elif sys.argv[i] in ["-n", "-j", "-b"] and i + 1 < len(sys.argv):
+            args[sys.argv[i]] = sys.argv[i + 1]
+            i += 2
+        else:
+            raise SystemExit(usage)
+
+    start, end = args.get("-g", (None, None))
+    search(
+        method=sys.argv[1],
+        mode="pooled" if "-p" in sys.argv else "player",
+        backends=args["-b"].split(",") if "-b" in args else None,
+        n_trials=int(args.get("-n", N_TRIALS)),
+        start=start, end=end,
+        n_workers=int(args.get("-j", 1)),
+    )